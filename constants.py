@@ -4,6 +4,10 @@ from utils.season import get_current_understat_season, season_to_name
 # Base directory for Parquet files
 PARQUET_PATH = "data/understat_players"
 
+# Data versions kept by every per-version cache: the current one and the previous one
+# (a fetch run creates a new version with each partition it swaps)
+DATA_VERSION_CACHE_ENTRIES = 2
+
 CURRENT_SEASON = get_current_understat_season()
 CURRENT_SEASON_NAME = season_to_name(CURRENT_SEASON)
 
@@ -1,31 +1,47 @@
 import streamlit as st
 import pandas as pd
-from constants import PARQUET_PATH, METRIC_LABELS
-from utils.data_loader import load_understat_data
-from utils.players import select_single_player, build_pos_map
+from constants import PARQUET_PATH, METRIC_LABELS, LEAGUE_NAME_MAP
+from utils.season import SEASON_NAME_MAP
+from utils.data_loader import load_prepared_data, get_data_version
+from utils.players import select_players, gather_players, get_player_index, publish_selections, published_selections
+from utils.season_cube import get_season_cube
 from utils.charts import plot_radar
-from utils.format import clean_html_entities
+from utils.figure_cache import cached_figure, figure_key
+from utils.percentiles import COHORTS, DEFAULT_COHORT, get_cohort_percentiles, cohort_percentile_index
 from utils.filters import multiselect_filter
+from utils.similarity import MIN_MINUTES_SIMILAR, get_similarity_index, similar_players
+from utils.profiling import start_page, section, render_profile_panel, fragment
 
 # --------------------------- PAGE CONFIGURATION ---------------------------
 
-st.set_page_config(page_title="Player Profile", layout="wide")
+PAGE = "Player Profile"
+
+st.set_page_config(page_title=PAGE, layout="wide")
+start_page(PAGE)
 
 st.title("🕸️ Player Profile")
 
-# --------------------------- LOAD DATA & SELECT PLAYERS ---------------------------
+# --------------------------- LOAD DATA ---------------------------
+
+section("Load data")
+data_version = get_data_version(PARQUET_PATH)
+df = load_prepared_data(PARQUET_PATH, data_version=data_version)
+cohort_percentiles = get_cohort_percentiles(df, data_version)
+player_index = get_player_index(df, data_version)
+pos_map = player_index["pos_map"]
+season_cube = get_season_cube(df, player_index, data_version)
 
-df = load_understat_data(PARQUET_PATH)
-df = clean_html_entities(df, ["player_name", "team_title"])
-pos_map = build_pos_map(df)
+# Three fragments: changing a player reruns the selection (then the whole page once
+# the selection changed), radar or similar-player options rerun their own section only
 
-col1, col2 = st.columns(2)
+# --------------------------- SELECT PLAYERS ---------------------------
 
-with col1:
-    p1_data, p1_label = select_single_player(df, pos_map, label="Player 1", key_prefix="p1")
+@fragment(PAGE, "Player selection")
+def player_selection():
+    section("Select players")
+    publish_selections(select_players(pos_map, player_index))
 
-with col2:
-    p2_data, p2_label = select_single_player(df, pos_map, label="Player 2", key_prefix="p2")
+player_selection()
 
 st.divider()
 
@@ -47,23 +63,95 @@ RADAR_KEY_TO_LABEL = {
 
 DEFAULT_RADAR_METRICS = ["goals_per90", "shots_per90", "assists_per90", "xGBuildup_per90", "xGChain_per90"]
 
-with st.expander("Radar metrics", expanded=False):
-    selected_labels = multiselect_filter(
-        "Select radar metrics",
-        series=pd.Series(RADAR_LABEL_TO_KEY.keys()),
-        key="radar_stats",
-        default=[RADAR_KEY_TO_LABEL[k] for k in DEFAULT_RADAR_METRICS],
+# --------------------------- RADAR ---------------------------
+
+@fragment(PAGE, "Radar")
+def radar():
+    section("Radar")
+    selections = published_selections()
+
+    with st.expander("Radar metrics", expanded=False):
+        selected_labels = multiselect_filter(
+            "Select radar metrics",
+            series=pd.Series(RADAR_LABEL_TO_KEY.keys()),
+            key="radar_stats",
+            default=[RADAR_KEY_TO_LABEL[k] for k in DEFAULT_RADAR_METRICS],
+        )
+
+    cohort = st.selectbox(
+        "Compare against",
+        list(COHORTS.keys()),
+        index=list(COHORTS.keys()).index(DEFAULT_COHORT),
+        key="radar_cohort",
+        help="Percentiles are ranked against this group of player-seasons.",
     )
 
-selected_stats = [RADAR_LABEL_TO_KEY[l] for l in selected_labels]
-title = "Performance Profile"
+    selected_stats = [RADAR_LABEL_TO_KEY[l] for l in selected_labels]
+    title = "Performance Profile"
+
+    if len(selected_stats) >= 3:
+        def build_radar():
+            # Players are only gathered to build a missing figure,
+            # each ranked against their own group of the cohort
+            players = gather_players(df, season_cube, selections)
+            percentile_indexes = [cohort_percentile_index(cohort_percentiles, cohort, row) for _, row in players.iterrows()]
+            return plot_radar(df, players, selected_stats, title, percentile_indexes)
+
+        fig = cached_figure(figure_key(data_version, title, selections, selected_stats, cohort=cohort), build_radar)
+
+        if fig is not None:
+            st.plotly_chart(fig, width="stretch")
+        else:
+            st.info("Select at least one player to see the chart.")
+    else:
+        st.info("Select at least 3 metrics to display the radar chart.")
+
+radar()
+
+# --------------------------- SIMILAR PLAYERS ---------------------------
+
+@fragment(PAGE, "Similar players")
+def similar_players_section():
+    section("Similar players")
+    st.divider()
+    st.subheader("🔎 Similar players")
 
-if len(selected_stats) >= 3:
-    fig = plot_radar(df, p1_data, p2_data, p1_label, p2_label, selected_stats, title)
+    # All selected players' stats in one batched step
+    players = gather_players(df, season_cube, published_selections())
+    selected_players = {row["label"]: row for _, row in players.iterrows()}
 
-    if fig is not None:
-        st.plotly_chart(fig, width="stretch")
+    if not selected_players:
+        st.info("Select a player to find players with a similar per-90 profile.")
     else:
-        st.info("Select at least one player to see the chart.")
-else:
-    st.info("Select at least 3 metrics to display the radar chart.")
\ No newline at end of file
+        col_s1, col_s2, col_s3, col_s4 = st.columns(4)
+
+        with col_s1:
+            target = st.selectbox("Similar to", list(selected_players), key="similar_target")
+        with col_s2:
+            n_similar = st.slider("Number of players", min_value=5, max_value=25, value=10, key="similar_count")
+        with col_s3:
+            similar_min_minutes = st.number_input("Min minutes played", min_value=0, value=MIN_MINUTES_SIMILAR,
+                                                  step=90, key="similar_min_minutes")
+        with col_s4:
+            same_position = st.checkbox("Same position", key="similar_same_position")
+            same_league = st.checkbox("Same league", key="similar_same_league")
+
+        similarity_index = get_similarity_index(df, season_cube, data_version)
+        similar = similar_players(similarity_index, selected_players[target], k=n_similar,
+                                  min_minutes=similar_min_minutes, same_position=same_position,
+                                  same_league=same_league)
+
+        if similar.empty:
+            st.info("No similar players found. Try lowering the minutes or removing restrictions.")
+        else:
+            similar = similar.assign(
+                season=similar["season"].map(lambda s: SEASON_NAME_MAP.get(s, s)),
+                league=similar["league"].map(lambda l: LEAGUE_NAME_MAP.get(l, l)),
+                distance=similar["distance"].round(2),
+            ).rename(columns={**METRIC_LABELS, "distance": "Distance"})
+            st.caption("Closest player-seasons by standardized per-90 output (lower distance = more similar).")
+            st.dataframe(similar, width="stretch", hide_index=True)
+
+similar_players_section()
+
+render_profile_panel()
\ No newline at end of file
@@ -1,38 +1,43 @@
 import streamlit as st
 from constants import PARQUET_PATH
-from utils.data_loader import load_understat_data
-from utils.players import select_single_player, build_pos_map
+from utils.data_loader import load_prepared_data, get_data_version
+from utils.players import select_players, gather_players, get_player_index, publish_selections, published_selections
+from utils.season_cube import get_season_cube
 from utils.charts import plot_comparison
-from utils.format import clean_html_entities
+from utils.figure_cache import cached_figure, figure_key
+from utils.profiling import start_page, section, render_profile_panel, fragment
 
 # --------------------------- PAGE CONFIGURATION ---------------------------
 
-st.set_page_config(page_title="Creativity", layout="wide")
+PAGE = "Creativity"
 
-st.title("🎯 Creativity")
+st.set_page_config(page_title=PAGE, layout="wide")
+start_page(PAGE)
 
-# --------------------------- LOAD DATA & SELECT PLAYERS ---------------------------
+st.title("🎯 Creativity")
 
-df = load_understat_data(PARQUET_PATH)
-df = clean_html_entities(df, ["player_name", "team_title"])
-pos_map = build_pos_map(df)
+# --------------------------- LOAD DATA ---------------------------
 
-col1, col2 = st.columns(2)
+section("Load data")
+data_version = get_data_version(PARQUET_PATH)
+df = load_prepared_data(PARQUET_PATH, data_version=data_version)
+player_index = get_player_index(df, data_version)
+pos_map = player_index["pos_map"]
+season_cube = get_season_cube(df, player_index, data_version)
 
-with col1:
-    p1_data, p1_label = select_single_player(df, pos_map, label="Player 1", key_prefix="p1")
+# Two fragments: changing a player reruns the selection (then the whole page once
+# the selection changed), changing a chart option reruns the chart only
 
-with col2:
-    p2_data, p2_label = select_single_player(df, pos_map, label="Player 2", key_prefix="p2")
+# --------------------------- SELECT PLAYERS ---------------------------
 
-st.divider()
+@fragment(PAGE, "Player selection")
+def player_selection():
+    section("Select players")
+    publish_selections(select_players(pos_map, player_index))
 
-# --------------------------- STAT TYPE TOGGLE ---------------------------
+player_selection()
 
-default_toggle = st.session_state.get("use_per90", False)
-use_per90 = st.toggle("Per 90 mins", value=default_toggle)
-st.session_state["use_per90"] = use_per90
-stat_type = "Per 90 mins" if use_per90 else "Total Stats"
+st.divider()
 
 # --------------------------- METRIC SECTIONS ---------------------------
 
@@ -41,11 +46,32 @@ creativity_stats_per_90 = ['assists_per90', 'xA_per90', 'key_passes_per90']
 creativity_stats.reverse() # the list shows from top to down
 creativity_stats_per_90.reverse()
 
-stats = creativity_stats_per_90 if stat_type == 'Per 90 mins' else creativity_stats
-title = "Creativity"
+# --------------------------- CHART ---------------------------
+
+@fragment(PAGE, "Chart")
+def chart():
+    section("Stat type toggle")
+    default_toggle = st.session_state.get("use_per90", False)
+    use_per90 = st.toggle("Per 90 mins", value=default_toggle)
+    st.session_state["use_per90"] = use_per90
+    stat_type = "Per 90 mins" if use_per90 else "Total Stats"
+
+    section("Metric sections")
+    stats = creativity_stats_per_90 if stat_type == 'Per 90 mins' else creativity_stats
+    title = "Creativity"
+    selections = published_selections()
+
+    # Shared across sessions: flipping per-90 back and forth reuses both figures,
+    # players are only gathered to build a missing one
+    fig = cached_figure(
+        figure_key(data_version, title, selections, stats, stat_type),
+        lambda: plot_comparison(gather_players(df, season_cube, selections), stats, stat_type, title),
+    )
+    if fig is not None:
+        st.plotly_chart(fig, width="stretch")
+    else:
+        st.info("Select at least one player to see the chart.")
+
+chart()
 
-fig = plot_comparison(p1_data, p2_data, p1_label, p2_label, stats, stat_type, title)
-if fig is not None:
-    st.plotly_chart(fig, width="stretch")
-else:
-    st.info("Select at least one player to see the chart.")
\ No newline at end of file
+render_profile_panel()
\ No newline at end of file
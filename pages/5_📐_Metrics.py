@@ -1,54 +1,61 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from utils.data_loader import load_understat_data
-from utils.format import clean_html_entities
-from utils.players import select_single_player, display_key_stats, enrich_player_metrics, build_pos_map
+from utils.data_loader import load_prepared_data, get_data_version
+from utils.players import (select_player_seasons, player_selection, display_key_stats, enrich_player_metrics,
+                           get_player_index)
+from utils.season_cube import get_season_cube, aggregate_selections
 from constants import PARQUET_PATH, LEAGUE_NAME_MAP
 from utils.season import SEASON_NAME_MAP
+from utils.memory import relabel
+from utils.profiling import start_page, section, render_profile_panel
 
 # --------------------------- PAGE CONFIGURATION ---------------------------
 
 st.set_page_config(page_title="Metrics", layout="wide")
+start_page("Metrics")
 
 st.title("📐 Metrics")
 
 # --------------------------- PLAYER SELECTION ---------------------------
 
-df = load_understat_data(PARQUET_PATH)
-df = clean_html_entities(df, ["player_name", "team_title"])
-pos_map = build_pos_map(df)
+section("Player selection")
+data_version = get_data_version(PARQUET_PATH)
+df = load_prepared_data(PARQUET_PATH, data_version=data_version)
+player_index = get_player_index(df, data_version)
+pos_map = player_index["pos_map"]
+season_cube = get_season_cube(df, player_index, data_version)
 
 col1, col2 = st.columns(2)
 
-p1_data, p1_label, p1_clean = None, None, None
-p2_data, p2_label, p2_clean = None, None, None
-
-with col1:
-    p1_data, p1_label = select_single_player(df, pos_map, label="Player 1", key_prefix="p1")
-
-    # If no Player 1 selected, stop the page here
-    if p1_data is not None:
-        p1_clean = p1_data.replace({**LEAGUE_NAME_MAP, **SEASON_NAME_MAP})
-        p1_clean = enrich_player_metrics(p1_clean)
-
-with col2:
-    p2_data, p2_label = select_single_player(df, pos_map, label="Player 2", key_prefix="p2")
-
-    if p2_data is not None:
-        p2_clean = p2_data.replace({**LEAGUE_NAME_MAP, **SEASON_NAME_MAP})
-        p2_clean = enrich_player_metrics(p2_clean)
+slots = []
+for key_prefix, col in [("p1", col1), ("p2", col2)]:
+    with col:
+        player, seasons, all_seasons = select_player_seasons(
+            pos_map, label=f"Player {key_prefix[1:]}", key_prefix=key_prefix, player_index=player_index
+        )
+    slots.append(None if player is None else player_selection(player, seasons, all_seasons))
+
+# Same totals as the comparison pages: all rows of a player-season summed over the cube
+players = aggregate_selections(season_cube, df, [s for s in slots if s is not None])
+players = players.assign(league=relabel(players["league"], LEAGUE_NAME_MAP), season=relabel(players["season"], SEASON_NAME_MAP))
+players = enrich_player_metrics(players.reset_index(drop=True))
+rows = iter(range(len(players)))
+p1_clean, p2_clean = (None if s is None else players.iloc[next(rows)] for s in slots)
 
 st.divider()
 
 # --------------------------- PLAYER HEADER SECTION ---------------------------
 
+section("Player header section")
 if p1_clean is None and p2_clean is None:
     st.info("Select at least one player to see the key metrics.")
+    render_profile_panel()
     st.stop()
     
 # --------------------------- KEY STATS TOTAL ---------------------------
 
+section("Key stats total")
 metrics_total = [
     ("Goals", "goals"),
     ("Assists", "assists"),
@@ -61,6 +68,7 @@ st.divider()
 
 # --------------------------- KEY STATS PER 90 ---------------------------
 
+section("Key stats per 90")
 metrics_per90 = [
     ("Goals / 90", "goals_per90"),
     ("Assists / 90", "assists_per90"),
@@ -73,6 +81,7 @@ st.divider()
 
 # --------------------------- FINISHING ---------------------------
 
+section("Finishing")
 metrics_finishing = [
     ("Conversion Rate (%)", "conversion_rate"),
     ("xG per Shot", "xG_per_shot"),
@@ -86,6 +95,7 @@ st.divider()
 
 # --------------------------- CREATIVITY ---------------------------
 
+section("Creativity")
 metrics_creation = [
     ("Assists per Key Pass", "assists_per_key_pass"), 
     ("xA per Key Pass", "xA_per_key_pass"),
@@ -99,6 +109,7 @@ st.divider()
 
 # --------------------------- BUILD UP ---------------------------
 
+section("Build up")
 metrics_buildup = [
     ("xG Buildup", "xGBuildup"),
     ("xG Chain", "xGChain"),
@@ -112,6 +123,7 @@ st.divider()
 
 # --------------------------- USAGE ---------------------------
 
+section("Usage")
 metrics_usage = [
     ("Games Played", "games"),
     ("Minutes Played", "time"),
@@ -125,6 +137,7 @@ st.divider()
 
 # --------------------------- DISCIPLINE ---------------------------
 
+section("Discipline")
 
 metrics_discipline = [
     ("Red Cards", "red_cards"),
@@ -136,3 +149,5 @@ metrics_discipline = [
 display_key_stats(title="Discipline & On-Pitch Behavior", p1_clean=p1_clean, p2_clean=p2_clean, metrics=metrics_discipline)
 
 st.divider()
+
+render_profile_panel()
@@ -1,50 +1,76 @@
 import streamlit as st
 from constants import PARQUET_PATH, CURRENT_SEASON_NAME, CURRENT_SEASON
-from utils.data_loader import load_understat_data
-from utils.leaderboard import display_leaderboard, build_player_table
-from utils.format import clean_html_entities
+from utils.data_loader import load_prepared_data, get_data_version
+from utils.leaderboard import display_leaderboard, get_player_table, SPLITS
+from utils.filters import number_input_persist
+from utils.profiling import start_page, section, render_profile_panel
 
 ALL_SEASON_STRING = "all seasons"
 
 # --------------------------- PAGE CONFIGURATION ---------------------------
 
 st.set_page_config(page_title="Leaderboard", layout="wide")
+start_page("Leaderboard")
 
 st.title("🥇 Leaderboard")
 
 # --------------------------- LOAD DATA ---------------------------
 
-df = load_understat_data(PARQUET_PATH)
-df = clean_html_entities(df, ["player_name", "team_title"])
+section("Load data")
+data_version = get_data_version(PARQUET_PATH)
+df = load_prepared_data(PARQUET_PATH, data_version=data_version)
+
+# --------------------------- LEADERBOARD OPTIONS ---------------------------
+
+section("Leaderboard options")
+opt1, opt2 = st.columns(2)
+
+with opt1:
+    split_label = st.selectbox("Split by", ["Overall"] + list(SPLITS), key="leaderboard_split")
+    split_by = None if split_label == "Overall" else split_label
+
+with opt2:
+    min_minutes = number_input_persist(
+        "Min minutes played",
+        key="leaderboard_min_minutes",
+        min_value=0,
+        max_value=None,
+        value=0,
+        step=90,
+    )
 
 # --------------------------- CURRENT SEASON LEADERBOARD ---------------------------
 
+section("Current season leaderboard")
 st.subheader(f"Top Performers in the {CURRENT_SEASON_NAME} Season")
 
 with st.spinner("Crunching the numbers… hang tight! ⏳"):
-    current_season_players = build_player_table(df, season=CURRENT_SEASON)
+    current_season_players = get_player_table(df, data_version, season=CURRENT_SEASON)
 
 col1, col2 = st.columns(2)
 
 with col1:
-    display_leaderboard(current_season_players, ["goals", "conversion_rate"], CURRENT_SEASON_NAME)
-    display_leaderboard(current_season_players, ["goal_contrib"], CURRENT_SEASON_NAME)
+    display_leaderboard(current_season_players, ["goals", "conversion_rate"], CURRENT_SEASON_NAME, min_minutes=min_minutes, split_by=split_by)
+    display_leaderboard(current_season_players, ["goal_contrib"], CURRENT_SEASON_NAME, min_minutes=min_minutes, split_by=split_by)
 
 with col2:
-    display_leaderboard(current_season_players, ["assists", "assists_per_key_pass"], CURRENT_SEASON_NAME)
-    display_leaderboard(current_season_players, ["xGBuildup"], CURRENT_SEASON_NAME)
+    display_leaderboard(current_season_players, ["assists", "assists_per_key_pass"], CURRENT_SEASON_NAME, min_minutes=min_minutes, split_by=split_by)
+    display_leaderboard(current_season_players, ["xGBuildup"], CURRENT_SEASON_NAME, min_minutes=min_minutes, split_by=split_by)
 
 # --------------------------- ALL TIME LEADERBOARD  ---------------------------
 
+section("All time leaderboard")
 st.subheader("All-Time Leaderboards (data since 2014/15)")
 
 with st.spinner("Crunching the numbers… hang tight! ⏳"):
-    all_players = build_player_table(df, season="All seasons")
+    all_players = get_player_table(df, data_version, season="All seasons")
 
 col1, col2 = st.columns(2)
 with col1:
-    display_leaderboard(all_players, ["goals", "conversion_rate"], ALL_SEASON_STRING)
-    display_leaderboard(all_players, ["goal_contrib"], ALL_SEASON_STRING)
+    display_leaderboard(all_players, ["goals", "conversion_rate"], ALL_SEASON_STRING, min_minutes=min_minutes, split_by=split_by)
+    display_leaderboard(all_players, ["goal_contrib"], ALL_SEASON_STRING, min_minutes=min_minutes, split_by=split_by)
 with col2:
-    display_leaderboard(all_players, ["assists", "assists_per_key_pass"], ALL_SEASON_STRING)
-    display_leaderboard(all_players, ["xGBuildup"], ALL_SEASON_STRING)    
\ No newline at end of file
+    display_leaderboard(all_players, ["assists", "assists_per_key_pass"], ALL_SEASON_STRING, min_minutes=min_minutes, split_by=split_by)
+    display_leaderboard(all_players, ["xGBuildup"], ALL_SEASON_STRING, min_minutes=min_minutes, split_by=split_by)
+
+render_profile_panel()
\ No newline at end of file
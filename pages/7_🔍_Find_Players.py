@@ -1,57 +1,91 @@
 import streamlit as st
-from constants import PARQUET_PATH, LEAGUE_NAME_MAP, METRIC_LABELS, STAT_FILTERS, FLOAT_KEYS, RESET_KEYS
-from utils.data_loader import load_understat_data
-from utils.players import enrich_player_metrics
-from utils.filters import multiselect_filter, number_input_persist, apply_list_filter, apply_stat_filters
-from utils.players import get_result_dataframe
-from utils.format import clean_html_entities
-from utils.season import SEASON_NAME_MAP
+from constants import PARQUET_PATH, METRIC_LABELS, STAT_FILTERS, FLOAT_KEYS, RESET_KEYS
+from utils.data_loader import load_prepared_data, get_data_version, get_column_stats
+from utils.column_stats import column_bounds, typical_range, TYPICAL_RANGE
+from utils.filters import (multiselect_options, number_input_persist, get_filter_index, selection_mask,
+                           combine_masks, available_options, stat_mask, range_columns, PERCENTILE_COHORTS)
+from utils.players import get_player_index
+from utils.season_cube import get_season_cube
+from utils.format import format_value
+from utils.results import get_result_table, sorted_columns, sort_order, page_positions, PAGE_SIZES
+from utils.profiling import start_page, section, render_profile_panel
 
 # --------------------------- PAGE CONFIGURATION ---------------------------
 
 st.set_page_config(page_title="Find Players", layout="wide")
+start_page("Find Players")
 st.title("🔍 Find Players")
 
 # --------------------------- LOAD & PREP DATA -----------------------------
 
-df = load_understat_data(PARQUET_PATH)
-
-df = clean_html_entities(df, ["player_name", "team_title"])
-df = df.replace({**LEAGUE_NAME_MAP, **SEASON_NAME_MAP})
-df = enrich_player_metrics(df)
+section("Load & prep data")
+data_version = get_data_version(PARQUET_PATH)
+df = load_prepared_data(PARQUET_PATH, labelled=True, data_version=data_version)
+
+# The cube is built on the unlabelled frame, rows line up with df
+base_df = load_prepared_data(PARQUET_PATH, data_version=data_version)
+season_cube = get_season_cube(base_df, get_player_index(base_df, data_version), data_version)
+filter_index = get_filter_index(df, data_version)
+# Widget bounds come from the statistics sidecars, not from the frame
+column_stats = get_column_stats(PARQUET_PATH, data_version)
+
+# Counting columns: their (approximate, merged) quantiles are shown as whole numbers
+INT_COLS = {col for col, key in STAT_FILTERS if key not in FLOAT_KEYS}
+
+def typical_bounds(col):
+    """Typical range of col from the sidecar quantiles, rounded for display (None without them)."""
+    typical = typical_range(column_stats, col)
+    if typical is None:
+        return None
+    digits = 0 if col in INT_COLS else 2
+    return tuple(round(float(v), digits) for v in typical)
+
+def range_help(col):
+    typical = typical_bounds(col)
+    if typical is None:
+        return None
+    low_q, high_q = (round(q * 100) for q in TYPICAL_RANGE)
+    return (f"Typical range ({low_q}th–{high_q}th percentile of a player-season row): "
+            f"{format_value(typical[0])} – {format_value(typical[1])}")
 
 # --------------------------- FILTERS --------------------------------------
 
+section("Filters")
 st.subheader("Filters")
 
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    selected_seasons = multiselect_filter("Season(s)", df["season"], f"seasons_multifilter", sort_reverse=True)
-    df_seasons = df[df["season"].isin(selected_seasons)] if selected_seasons else df
+    selected_seasons = multiselect_options("Season(s)", available_options(filter_index, "season")[::-1], f"seasons_multifilter")
+    season_mask = selection_mask(filter_index, "season", selected_seasons)
 
 with col2:
-    selected_leagues = multiselect_filter("League(s)", df_seasons["league"], f"leagues_multifilter")
-    df_leagues = df_seasons[df_seasons["league"].isin(selected_leagues)] if selected_leagues else df_seasons
+    selected_leagues = multiselect_options("League(s)", available_options(filter_index, "league", season_mask), f"leagues_multifilter")
+    league_mask = combine_masks(season_mask, selection_mask(filter_index, "league", selected_leagues))
 
 with col3:
-    selected_teams = multiselect_filter("Team(s)", df_leagues["team_title"], f"teams_multifilter")
-    df_teams = df_leagues[df_leagues["team_title"].isin(selected_teams)] if selected_teams else df_leagues
+    selected_teams = multiselect_options("Team(s)", available_options(filter_index, "team_title", league_mask), f"teams_multifilter")
+    team_mask = combine_masks(league_mask, selection_mask(filter_index, "team_title", selected_teams))
 
 with col4:
-    selected_positions = multiselect_filter("Position(s)", df_teams["position"], f"positions_multifilter")
+    selected_positions = multiselect_options("Position(s)", available_options(filter_index, "position", team_mask), f"positions_multifilter")
 
 # --------------------------- RESET BUTTON ---------------------------------
 
+section("Reset button")
 st.subheader("Stat filters")
 
 if st.button("🔄 Reset stat filters"):
     for key in RESET_KEYS:
         st.session_state[key] = 0.0 if key in FLOAT_KEYS else 0
         st.session_state[f"__store__{key}"] = 0.0 if key in FLOAT_KEYS else 0         
+    st.session_state["max_stats_multifilter"] = []
+    st.session_state["__store__max_stats_multifilter"] = []
+    st.session_state["top_pct_stat"] = "—"
 
 # --------------------------- BASIC STAT FILTERS ---------------------------------
 
+section("Basic stat filters")
 with st.expander("Basic stat filters"):
     col_s1, col_s2 = st.columns(2)
     
@@ -60,16 +94,18 @@ with st.expander("Basic stat filters"):
             "Min games played",
             key="min_games",
             min_value=0,
-            max_value=int(df["games"].max()),
+            max_value=int(column_bounds(column_stats, "games")[1]),
             value=0,
+            help=range_help("games"),
         )
         min_minutes = number_input_persist(
             "Min minutes played",
             key="min_minutes",
             min_value=0,
-            max_value=int(df["time"].max()),
+            max_value=int(column_bounds(column_stats, "time")[1]),
             value=0,
             step=100,
+            help=range_help("time"),
         )
 
     with col_s2:
@@ -77,19 +113,22 @@ with st.expander("Basic stat filters"):
             "Min goals",
             key="min_goals",
             min_value=0,
-            max_value=int(df["goals"].max()),
+            max_value=int(column_bounds(column_stats, "goals")[1]),
             value=0,
+            help=range_help("goals"),
         )
         min_assists = number_input_persist(
             "Min assists",
             key="min_assists",
             min_value=0,
-            max_value=int(df["assists"].max()),
+            max_value=int(column_bounds(column_stats, "assists")[1]),
             value=0,
+            help=range_help("assists"),
         )
 
 # --------------------------- ADVANCED STAT FILTERS ---------------------------------
 
+section("Advanced stat filters")
 with st.expander("Advanced stat filters", expanded=False):
     col_s3, col_s4, col_s5, col_s6, col_s7 = st.columns(5)
 
@@ -98,18 +137,20 @@ with st.expander("Advanced stat filters", expanded=False):
             "Min goals per 90",
             key="min_goals_per90",
             min_value=0.0,
-            max_value=float(df["goals_per90"].max()),
+            max_value=float(column_bounds(column_stats, "goals_per90")[1]),
             value=0.0,
             step=0.1,
+            help=range_help("goals_per90"),
         )
 
         min_assists_per90 = number_input_persist(
             "Min assists per 90",
             key="min_assists_per90",
             min_value=0.0,
-            max_value=float(df["assists_per90"].max()),
+            max_value=float(column_bounds(column_stats, "assists_per90")[1]),
             value=0.0,
             step=0.1,
+            help=range_help("assists_per90"),
         )
 
     with col_s4:
@@ -117,18 +158,20 @@ with st.expander("Advanced stat filters", expanded=False):
             "Min expected goals (xG)",
             key="min_xg",
             min_value=0.0,
-            max_value=float(df["xG"].max()),
+            max_value=float(column_bounds(column_stats, "xG")[1]),
             value=0.0,
             step=1.0,
+            help=range_help("xG"),
         )
 
         min_xa = number_input_persist(
             "Min expected assists (xA)",
             key="min_xa",
             min_value=0.0,
-            max_value=float(df["xA"].max()),
+            max_value=float(column_bounds(column_stats, "xA")[1]),
             value=0.0,
             step=1.0,
+            help=range_help("xA"),
         )
 
     with col_s5:
@@ -136,18 +179,20 @@ with st.expander("Advanced stat filters", expanded=False):
             "Min xG per 90",
             key="min_xg_per90",
             min_value=0.0,
-            max_value=float(df["xG_per90"].max()),
+            max_value=float(column_bounds(column_stats, "xG_per90")[1]),
             value=0.0,
             step=0.1,
+            help=range_help("xG_per90"),
         )
 
         min_xa_per90 = number_input_persist(
             "Min xA per 90",
             key="min_xa_per90",
             min_value=0.0,
-            max_value=float(df["xA_per90"].max()),
+            max_value=float(column_bounds(column_stats, "xA_per90")[1]),
             value=0.0,
             step=0.1,
+            help=range_help("xA_per90"),
         )
 
     with col_s6:
@@ -155,18 +200,20 @@ with st.expander("Advanced stat filters", expanded=False):
             "Min xG chain",
             key="min_xg_chain",
             min_value=0.0,
-            max_value=float(df["xGChain"].max()),
+            max_value=float(column_bounds(column_stats, "xGChain")[1]),
             value=0.0,
             step=1.0,
+            help=range_help("xGChain"),
         )
 
         min_xg_buildup = number_input_persist(
             "Min xG buildup",
             key="min_xg_buildup",
             min_value=0.0,
-            max_value=float(df["xGBuildup"].max()),
+            max_value=float(column_bounds(column_stats, "xGBuildup")[1]),
             value=0.0,
             step=1.0,
+            help=range_help("xGBuildup"),
         )
 
     with col_s7:
@@ -174,43 +221,96 @@ with st.expander("Advanced stat filters", expanded=False):
             "Min xG chain per 90",
             key="min_xg_chain_per90",
             min_value=0.0,
-            max_value=float(df["xGChain_per90"].max()),
+            max_value=float(column_bounds(column_stats, "xGChain_per90")[1]),
             value=0.0,
             step=0.1,
+            help=range_help("xGChain_per90"),
         )
 
         min_xg_buildup_per90 = number_input_persist(
             "Min xG buildup per 90",
             key="min_xg_buildup_per90",
             min_value=0.0,
-            max_value=float(df["xGBuildup_per90"].max()),
+            max_value=float(column_bounds(column_stats, "xGBuildup_per90")[1]),
             value=0.0,
             step=0.1,
+            help=range_help("xGBuildup_per90"),
         )
 
-# --------------------------- APPLY FILTERS --------------------------------
-
-filtered_df = df.copy()
+# --------------------------- MAX BOUNDS & PERCENTILE FILTERS ---------------------------
+
+section("Max bounds & percentile filters")
+STAT_LABELS = {METRIC_LABELS.get(col, col): col for col, _ in STAT_FILTERS}
+
+with st.expander("Max bounds & percentile filters", expanded=False):
+    max_labels = multiselect_options("Stats with a maximum", list(STAT_LABELS), "max_stats_multifilter")
+
+    max_bounds = {}
+    max_cols = st.columns(4)
+    for i, label in enumerate(max_labels):
+        col = STAT_LABELS[label]
+        # A new maximum starts at the top of the column's typical range
+        typical = typical_bounds(col)
+        with max_cols[i % 4]:
+            max_bounds[col] = number_input_persist(
+                f"Max {label}",
+                key=f"max_{col}",
+                min_value=0.0,
+                max_value=None,
+                value=None if typical is None else float(typical[1]),
+                step=0.1 if col.endswith("_per90") else 1.0,
+                help=range_help(col),
+            )
+
+    col_p1, col_p2, col_p3 = st.columns(3)
+
+    with col_p1:
+        top_label = st.selectbox("Top X% by", ["—"] + list(STAT_LABELS), key="top_pct_stat")
+
+    with col_p2:
+        top_pct_value = number_input_persist(
+            "Top %",
+            key="top_pct_value",
+            min_value=1,
+            max_value=100,
+            value=10,
+            step=5,
+        )
 
-filtered_df = apply_list_filter(filtered_df, "season", selected_seasons)
-filtered_df = apply_list_filter(filtered_df, "league", selected_leagues)
-filtered_df = apply_list_filter(filtered_df, "position", selected_positions)
-filtered_df = apply_list_filter(filtered_df, "team_title", selected_teams)
+    with col_p3:
+        top_cohort = st.selectbox("Within", list(PERCENTILE_COHORTS), key="top_pct_cohort")
 
-# --------------------------- AGGREGATION LOGIC ----------------------------
+# --------------------------- RESULTS BEFORE STAT FILTERS --------------------------------
 
-result_df = get_result_dataframe(filtered_df, selected_seasons)
+section("Results before stat filters")
+# Cached per data version and list-filter selection: stat filter changes reuse it
+selection_key = (tuple(selected_seasons), tuple(selected_leagues), tuple(selected_teams), tuple(selected_positions))
+result = get_result_table(df, season_cube, filter_index, data_version, *selection_key)
+result_df = result["df"]
 
 # --------------------------- APPLY STAT FILTERS ---------------------------
 
-result_df = apply_stat_filters(result_df, STAT_FILTERS)
+section("Apply stat filters")
+ranges = [
+    (col, st.session_state.get(state_key, 0), max_bounds.get(col))
+    for col, state_key in STAT_FILTERS
+]
+top_pct = None
+if top_label != "—":
+    top_pct = (STAT_LABELS[top_label], top_pct_value, PERCENTILE_COHORTS[top_cohort])
+
+# Sorted lookups of the constrained columns, built once on the shared result table
+sorted_index = sorted_columns(result, range_columns(result_df, ranges))
+mask = stat_mask(result_df, ranges, top_pct=top_pct, sorted_index=sorted_index)
+n_found = len(result_df) if mask is None else int(mask.sum())
 
 # --------------------------- CLEAN & DISPLAY ------------------------------
 
+section("Clean & display")
 st.divider()
 st.subheader("Results")
 
-if result_df.empty:
+if n_found == 0:
     st.info("No players found for the selected criteria. Try relaxing some filters.")
 else:
     desired_order = [
@@ -235,10 +335,51 @@ else:
     ]
 
     existing_cols = [c for c in desired_order if c in result_df.columns]
-    clean_data = result_df[existing_cols].copy()
-    clean_data = clean_data.rename(columns=METRIC_LABELS)
-
-    st.markdown(f"Players found: {len(clean_data)}")
-    st.info("Click on any column header to sort the table by that metric.")
-
-    st.dataframe(clean_data, width="stretch", hide_index=True)
\ No newline at end of file
+    sort_labels = {METRIC_LABELS.get(c, c): c for c in existing_cols}
+
+    st.markdown(f"Players found: {n_found}")
+
+    # Sorting and paging happen here on the cached result; only the visible page is sent
+    col_p1, col_p2, col_p3, col_p4 = st.columns(4)
+
+    with col_p1:
+        stored_sort = st.session_state.get("__store__results_sort", METRIC_LABELS["time"])
+        labels = list(sort_labels)
+        sort_label = st.selectbox("Sort by", labels, key="results_sort",
+                                  index=labels.index(stored_sort) if stored_sort in labels else 0)
+        st.session_state["__store__results_sort"] = sort_label
+
+    with col_p2:
+        descending = st.toggle("Descending", key="results_sort_desc",
+                               value=st.session_state.get("__store__results_sort_desc", True))
+        st.session_state["__store__results_sort_desc"] = descending
+
+    with col_p3:
+        stored_size = st.session_state.get("__store__results_page_size", PAGE_SIZES[1])
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, key="results_page_size",
+                                 index=PAGE_SIZES.index(stored_size) if stored_size in PAGE_SIZES else 1)
+        st.session_state["__store__results_page_size"] = page_size
+
+    n_pages = -(-n_found // page_size)
+
+    # Back to the first page when the query, sort or page size changes, and never past the last page
+    query = (data_version, selection_key, tuple(ranges), top_pct, sort_label, descending, page_size)
+    if st.session_state.get("__store__results_query") != query or \
+            st.session_state.get("results_page", 1) > n_pages:
+        st.session_state.pop("results_page", None)
+        st.session_state["__store__results_page"] = 1
+    st.session_state["__store__results_query"] = query
+
+    with col_p4:
+        page = number_input_persist(f"Page (of {n_pages})", key="results_page",
+                                    min_value=1, max_value=n_pages, value=1)
+
+    start = (page - 1) * page_size
+    order = sort_order(result, sort_labels[sort_label], descending)
+    positions = page_positions(order, mask, start, start + page_size)
+
+    page_data = result_df.iloc[positions][existing_cols].rename(columns=METRIC_LABELS)
+    st.dataframe(page_data, width="stretch", hide_index=True)
+    st.caption(f"Rows {start + 1}–{start + len(page_data)} of {n_found}")
+
+render_profile_panel()
@@ -0,0 +1,192 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import plotly
+import pyarrow
+import streamlit as st
+from streamlit.logger import set_log_level
+from constants import PARQUET_PATH, STAT_FILTERS
+from utils.data_loader import load_understat_data, load_prepared_data
+from utils.leaderboard import build_player_table
+from utils.players import get_result_dataframe, enrich_player_metrics, build_player_index, gather_players
+from utils.filters import apply_stat_filters
+from utils.charts import plot_radar, plot_comparison
+from utils.figure_cache import cached_figure, figure_key
+from utils.percentiles import build_percentile_index
+from utils.season_cube import build_season_cube
+from utils.similarity import build_similarity_index, similar_players
+from scripts.synthetic_data import write_synthetic_dataset
+
+# Same stats as the default radar and the Finishing page
+RADAR_STATS = ["goals_per90", "shots_per90", "assists_per90", "xGBuildup_per90", "xGChain_per90"]
+COMPARISON_STATS = ["npxG", "npg", "shots", "xG", "goals"]
+
+# Shortlist size of the comparison charts
+COMPARE_PLAYERS = 10
+
+# Stat filter thresholds: this quantile of each column over the result rows
+FILTER_QUANTILE = 0.5
+
+# Where results are written by default (gitignored)
+RESULTS_DIR = Path("benchmarks")
+
+# ---------------------------TIMING---------------------------
+def time_call(fn, repeat, setup=None):
+    """
+    Run fn() repeat times (setup() before each run, not timed).
+    Returns wall-time statistics in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "repeat": repeat,
+    }
+
+def pick_players(df, n=2):
+    """The n players with the most minutes, as rows of df."""
+    order = pd.to_numeric(df["time"], errors="coerce").fillna(0).to_numpy().argsort()[::-1]
+    return [df.iloc[i] for i in order[:n]]
+
+def benchmark_dataset(base_path, repeat):
+    """
+    Time the hot paths on one league=*/season=* tree.
+    Streamlit caches are cleared before every run, so each timing is a cache miss.
+    """
+    results = {}
+
+    results["load_understat_data"] = time_call(lambda: load_understat_data(base_path), repeat,
+                                               setup=load_understat_data.clear)
+
+    df = load_prepared_data(base_path)
+    current_season = str(df["season"].max())
+    seasons = sorted(df["season"].unique())
+
+    results["build_player_table[current season]"] = time_call(
+        lambda: build_player_table(df, season=current_season), repeat)
+    results["build_player_table[All seasons]"] = time_call(
+        lambda: build_player_table(df, season="All seasons"), repeat)
+
+    results["get_result_dataframe[one season]"] = time_call(
+        lambda: get_result_dataframe(df[df["season"] == current_season], [current_season]), repeat)
+    results["get_result_dataframe[all seasons]"] = time_call(
+        lambda: get_result_dataframe(df, seasons), repeat)
+
+    result_df = enrich_player_metrics(get_result_dataframe(df, seasons))
+    for col, state_key in STAT_FILTERS:
+        st.session_state[state_key] = float(result_df[col].quantile(FILTER_QUANTILE)) if col in result_df else 0
+    results["apply_stat_filters"] = time_call(lambda: apply_stat_filters(result_df, STAT_FILTERS), repeat)
+    for _, state_key in STAT_FILTERS:
+        st.session_state.pop(state_key, None)
+
+    results["enrich_player_metrics"] = time_call(lambda: enrich_player_metrics(df), repeat)
+
+    cube = build_season_cube(df, build_player_index(df))
+    shortlist = [(p["player_name"], []) for p in pick_players(df, COMPARE_PLAYERS)]
+    results[f"gather_players[{COMPARE_PLAYERS}]"] = time_call(lambda: gather_players(df, cube, shortlist), repeat)
+    players = gather_players(df, cube, shortlist)
+    p1 = players.iloc[0]
+
+    results["build_percentile_index"] = time_call(lambda: build_percentile_index(df, RADAR_STATS), repeat)
+    index = build_percentile_index(df, RADAR_STATS)
+    results[f"plot_radar[{COMPARE_PLAYERS}]"] = time_call(
+        lambda: plot_radar(df, players, RADAR_STATS, "Radar", [index] * len(players)), repeat)
+    results[f"plot_comparison[{COMPARE_PLAYERS}]"] = time_call(
+        lambda: plot_comparison(players, COMPARISON_STATS, "Total Stats", "Finishing"), repeat)
+    key = figure_key("benchmark", "Finishing", shortlist, COMPARISON_STATS, "Total Stats")
+    build = lambda: plot_comparison(players, COMPARISON_STATS, "Total Stats", "Finishing")
+    cached_figure(key, build)
+    results[f"plot_comparison[{COMPARE_PLAYERS}, figure cache hit]"] = time_call(lambda: cached_figure(key, build), repeat)
+
+    results["build_similarity_index"] = time_call(lambda: build_similarity_index(df, cube), repeat)
+    similarity_index = build_similarity_index(df, cube)
+    results["similar_players"] = time_call(lambda: similar_players(similarity_index, p1, k=10), repeat)
+
+    return len(df), results
+
+# ---------------------------METADATA---------------------------
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    return {
+        "timestamp_utc": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "pyarrow": pyarrow.__version__,
+        "streamlit": st.__version__,
+        "plotly": plotly.__version__,
+    }
+
+# ---------------------------MAIN---------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time the app's hot paths on the real data and on synthetic scaled copies (not a test suite).")
+    parser.add_argument("--data-dir", default=PARQUET_PATH, help="real league=*/season=* tree")
+    parser.add_argument("--scales", default="10,100,1000",
+                        help="comma-separated row multipliers for synthetic data ('' = real data only). "
+                             "1000x needs tens of GB of memory")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per function")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic generator")
+    parser.add_argument("--output", default=str(RESULTS_DIR / "benchmark_results.json"),
+                        help="JSON file the results are written to")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Bare mode (no `streamlit run`) warns on every cached call and session_state access.
+    # Parse the config first: parsing it later would reset the log level
+    st.get_option("logger.level")
+    set_log_level("error")
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+
+    report = {"environment": environment(), "repeat": args.repeat, "datasets": []}
+
+    def run(name, scale, base_path):
+        print(f"[INFO] Benchmarking {name}")
+        entry = {"name": name, "scale": scale}
+        try:
+            entry["rows"], entry["results"] = benchmark_dataset(base_path, args.repeat)
+        except MemoryError as e:
+            entry["error"] = f"MemoryError: {e}"
+        report["datasets"].append(entry)
+        st.cache_data.clear()
+        st.cache_resource.clear()
+
+        for fn, timing in entry.get("results", {}).items():
+            print(f"  {fn:<40} median {timing['median'] * 1000:10.1f} ms")
+
+    run("real", 1, args.data_dir)
+    for scale in scales:
+        with tempfile.TemporaryDirectory(prefix=f"understat_x{scale}_") as tmp:
+            write_synthetic_dataset(tmp, scale, base_dir=args.data_dir, seed=args.seed)
+            run(f"synthetic x{scale}", scale, tmp)
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[INFO] Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import argparse
+from utils.partitioned_parquet import compact_partitions, DATA_DIR, ROW_GROUP_SIZE
+
+# ---------------------------MAIN---------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Merge the part files of each league/season partition into one.")
+    parser.add_argument("--base-dir", default=str(DATA_DIR),
+                        help="root of the league=*/season=* tree")
+    parser.add_argument("--min-files", type=int, default=2,
+                        help="only compact partitions with at least this many part files (1 = all)")
+    parser.add_argument("--row-group-size", type=int, default=ROW_GROUP_SIZE,
+                        help="maximum rows per row group in the compacted file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    compacted = compact_partitions(args.base_dir, min_files=args.min_files, row_group_size=args.row_group_size)
+    print(f"[INFO] Compacted {compacted} partitions")
+
+if __name__ == "__main__":
+    main()
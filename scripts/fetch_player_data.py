@@ -1,8 +1,17 @@
+import argparse
 import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import time
 import aiohttp
 import pandas as pd
+import understat.understat
 from understat import Understat
-from utils.partitioned_parquet import write_partitioned_players
+from scripts.fetch_scheduler import TokenBucket, call_with_retries
+from utils.partitioned_parquet import (write_partitioned_players, partition_key, partition_exists,
+                                       payload_hash, load_partition_hashes, save_partition_hashes)
+from utils.raw_cache import store_payload, load_payload, load_cache_index, save_cache_index, record_fetch, latest_payloads
 from utils.season import get_current_understat_season
 from utils.update_metadata import write_last_update
 
@@ -10,6 +19,20 @@ from utils.update_metadata import write_last_update
 # Be friendly to Understat's servers
 CONCURRENCY = 6
 
+# Token bucket: sustained requests per second and how many may go out back to back
+RATE_LIMIT = 2.0
+BURST = 4
+
+# Attempts after the first one, and the timeout of a single attempt (seconds)
+MAX_RETRIES = 4
+REQUEST_TIMEOUT = 30
+
+# Worker threads for the pandas transform + Parquet write of fetched payloads
+WORKERS = 2
+
+# Max fetched payloads waiting for a worker; fetches pause when the queue is full
+QUEUE_SIZE = 4
+
 LEAGUES = ["EPL", "La_liga", "Bundesliga", "Serie_A", "Ligue_1"] # top 5 leagues according to Understat API
 
 current_season = get_current_understat_season()
@@ -95,62 +118,249 @@ async def fetch_one(understat: Understat, league: str, season: int):
     records = await understat.get_league_players(league, season)
     return league, season, records
 
-async def fetch_one_limited(understat: Understat, sem: asyncio.Semaphore, league: str, season: int):
+def use_understat_base_url(base_url: str):
+    """
+    Point the understat client at another host, e.g. the local stand-in server
+    (scripts/understat_standin.py) for offline benchmarks.
+    """
+    understat.understat.LEAGUE_URL = f"{base_url.rstrip('/')}/getLeagueData/{{}}/{{}}"
+
+async def fetch_into_queue(understat: Understat, sem: asyncio.Semaphore, bucket: TokenBucket, queue: asyncio.Queue,
+                           league: str, season: int, errors: list, stats: dict,
+                           retries: int = MAX_RETRIES, timeout: float = REQUEST_TIMEOUT):
     """
-    Wrapper that respects the concurrency semaphore to avoid overwhelming the API.
+    Fetch one league-season (rate limited, with timeout and retries) and hand it to the workers.
+    The semaphore is held until the payload is queued, so with a full queue no new
+    request starts: at most CONCURRENCY + QUEUE_SIZE + WORKERS payloads are in memory.
     """
     async with sem:
-        return await fetch_one(understat, league, season)
-
-async def fetch_all(leagues, seasons):
-    """
-    Kick off all league-season fetches concurrently.
-    - Uses a shared aiohttp.ClientSession and TCPConnector with a limit.
-    - Collects successes and exceptions separately for clearer reporting.
-    """
-    sem = asyncio.Semaphore(CONCURRENCY)
-    connector = aiohttp.TCPConnector(limit=CONCURRENCY)
-    async with aiohttp.ClientSession(connector=connector) as session:
-        us = Understat(session)
-        tasks = [fetch_one_limited(us, sem, league, season)
-                 for league in leagues
-                 for season in seasons]
-        # Gather results without failing fast; keep exceptions in the list
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-    # Split successes from errors for downstream handling
-    ok = []
-    errors = []
-    for result in results:
-        if isinstance(result, Exception):
-            errors.append(result)
-        else:
-            ok.append(result)
-    return ok, errors
+        try:
+            result = await call_with_retries(lambda: fetch_one(understat, league, season),
+                                             bucket, retries, timeout, stats, label=f"{league} {season}")
+        except Exception as e:
+            errors.append((league, season, e))
+            return
+        await queue.put(result)
+
+async def process_queue(queue: asyncio.Queue, pool: ThreadPoolExecutor, process, results: list, errors: list):
+    """
+    Consume fetched payloads as they arrive and run process(league, season, records) in the pool.
+    Failures (transform or write) are recorded in errors, like fetch failures.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await queue.get()
+        try:
+            if item is None:
+                return
+            league, season, records = item
+            results.append((league, season, await loop.run_in_executor(pool, process, league, season, records)))
+        except Exception as e:
+            errors.append((league, season, e))
+        finally:
+            queue.task_done()
+
+async def run_pipeline(jobs, process, stats=None, concurrency=CONCURRENCY, workers=WORKERS, queue_size=QUEUE_SIZE,
+                       rate=RATE_LIMIT, burst=BURST, retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT):
+    """
+    Streaming fetch -> transform -> write.
+    - jobs: list of (league, season) pairs to fetch.
+    - process: sync function (league, season, records) -> outcome, run in a worker thread
+      as soon as its payload arrives, overlapping CPU work with network waits.
+    - stats: optional dict filled with request/retry/failure counters.
+    - Uses a shared aiohttp.ClientSession and TCPConnector with a limit,
+      and a token bucket shared by all requests (retries included).
+    Returns (outcomes, errors): [(league, season, outcome)] and [(league, season, exception)],
+    errors holding both fetch and processing failures.
+    """
+    sem = asyncio.Semaphore(concurrency)
+    bucket = TokenBucket(rate, burst)
+    queue = asyncio.Queue(maxsize=queue_size)
+    results, errors = [], []
+    if stats is None:
+        stats = {}
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            us = Understat(session)
+            consumers = [asyncio.create_task(process_queue(queue, pool, process, results, errors))
+                         for _ in range(workers)]
+
+            await asyncio.gather(*(fetch_into_queue(us, sem, bucket, queue, league, season, errors, stats,
+                                                    retries=retries, timeout=timeout)
+                                   for league, season in jobs))
+
+            # One stop marker per consumer once every payload is queued
+            for _ in consumers:
+                await queue.put(None)
+            await asyncio.gather(*consumers)
+
+    return results, errors
+
+# ---------------------------INCREMENTAL MODE---------------------------
+def select_jobs(leagues, seasons, full=False):
+    """
+    Decide which (league, season) partitions to fetch.
+    - full: every league-season.
+    - otherwise: seasons still in progress (the current one) plus partitions missing on disk.
+    """
+    return [(league, season)
+            for league in leagues
+            for season in seasons
+            if full or season == current_season or not partition_exists(league, season)]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch Understat player data into partitioned Parquet files.")
+    parser.add_argument("--full", action="store_true",
+                        help="refetch every league-season, not only the season in progress")
+    parser.add_argument("--force", action="store_true",
+                        help="rewrite partitions even if the payload hash is unchanged")
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT,
+                        help="sustained requests per second (token bucket refill rate)")
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES,
+                        help="retries per league-season after the first attempt")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT,
+                        help="timeout of a single request in seconds")
+    parser.add_argument("--base-url",
+                        help="fetch from another host, e.g. the local stand-in server")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="fetch and transform only: no Parquet, hash, cache or metadata writes")
+    parser.add_argument("--rebuild-from-cache", action="store_true",
+                        help="no network: re-run transform + write for every partition from the raw cache")
+    parser.add_argument("--as-of",
+                        help="with --rebuild-from-cache: use the latest payloads fetched on or before this date (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="with --rebuild-from-cache: number of worker processes")
+    return parser.parse_args(argv)
+
+def process_partition(league, season, records, previous_hash=None, force=False, dry_run=False):
+    """
+    Transform and write one fetched league-season (runs in a worker thread).
+    The raw payload is kept in the raw cache first, so the transform can be re-run later.
+    Returns (status, digest) with status "written", "unchanged" or "empty".
+    With dry_run the frame is built but nothing is written (status "transformed").
+    """
+    # Hash and cache the raw payload before to_dataframe adds league/season to the records
+    digest = payload_hash(records)
+    if not dry_run:
+        store_payload(records, digest)
+    if not force and previous_hash == digest and partition_exists(league, season):
+        print(f"[SKIP] {league} {season} unchanged")
+        return "unchanged", digest
+
+    df = to_dataframe(league, season, records)
+    if df.empty:
+        print(f"[INFO] No data for {league} {season}")
+        return "empty", digest
+    if dry_run:
+        return "transformed", digest
+
+    write_partitioned_players(df, mode="overwrite")
+    return "written", digest
+
+# ---------------------------REBUILD FROM CACHE---------------------------
+def rebuild_partition(league, season, digest):
+    """Transform and write one league-season from its cached raw payload (runs in a worker process)."""
+    df = to_dataframe(league, season, load_payload(digest))
+    if df.empty:
+        print(f"[INFO] No data for {league} {season}")
+        return "empty"
+    write_partitioned_players(df, mode="overwrite")
+    return "written"
+
+def rebuild_from_cache(workers=None, as_of=None):
+    """
+    Re-run transform + write for every cached partition, in parallel worker processes.
+    Uses each partition's most recent cached payload (on or before as_of).
+    Returns (outcomes, errors): {partition key: (status, digest)} and {partition key: exception}.
+    """
+    latest = latest_payloads(load_cache_index(), as_of=as_of)
+    outcomes, errors = {}, {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for key, digest in latest.items():
+            league, season = (part.split("=", 1)[1] for part in key.split("/"))
+            futures[key] = (pool.submit(rebuild_partition, league, season, digest), digest)
+        for key, (future, digest) in futures.items():
+            try:
+                outcomes[key] = (future.result(), digest)
+            except Exception as e:
+                errors[key] = e
+    return outcomes, errors
 
 # ---------------------------MAIN---------------------------
-async def main():
+async def main(argv=None):
     """
     Orchestrates fetching, transformation, and partitioned Parquet writes.
+    - Fetches only in-progress/missing partitions unless --full is given.
+    - Transforms and writes each payload as soon as it arrives (see run_pipeline).
     - Logs any fetch errors.
-    - Skips empty datasets.
+    - Skips empty datasets and payloads whose content hash is unchanged.
     - Writes each (league, season) partition, here using overwrite to keep only latest pull.
+    - Keeps every raw payload in the raw cache; --rebuild-from-cache rewrites all partitions
+      from it without any network access.
+    Returns the exit status: 1 if any partition failed to fetch or process, else 0.
     """
-    successes, errors = await fetch_all(LEAGUES, SEASONS)
+    args = parse_args(argv)
+    hashes = load_partition_hashes()
+
+    if args.rebuild_from_cache:
+        start = time.perf_counter()
+        outcomes, errors = rebuild_from_cache(workers=args.workers, as_of=args.as_of)
+        for key, e in errors.items():
+            print(f"Rebuild failed {key}: {e!r}")
+        for key, (status, digest) in outcomes.items():
+            if status == "written":
+                hashes[key] = digest
+        save_partition_hashes(hashes)
+        print(f"[INFO] Rebuilt {len(outcomes)} partitions from cache in {time.perf_counter() - start:.1f}s, "
+              f"{len(errors)} failed")
+        return 1 if errors else 0
+    if args.base_url:
+        use_understat_base_url(args.base_url)
+
+    def process(league, season, records):
+        previous = hashes.get(partition_key(league, season))
+        return process_partition(league, season, records, previous_hash=previous,
+                                 force=args.force, dry_run=args.dry_run)
+
+    jobs = select_jobs(LEAGUES, SEASONS, full=args.full)
+    print(f"[INFO] Fetching {len(jobs)} league-season partitions")
+    stats = {}
+    start = time.perf_counter()
+    outcomes, errors = await run_pipeline(jobs, process, stats=stats, rate=args.rate,
+                                          retries=args.retries, timeout=args.timeout)
+    elapsed = time.perf_counter() - start
+
+    # Report any failures (network issues, API errors, etc. that survived the retries, or
+    # transform/write errors)
+    for league, season, e in errors:
+        print(f"Failed {league} {season}: {e!r}")
+
+    print(f"[INFO] {len(outcomes)}/{len(jobs)} partitions fetched in {elapsed:.1f}s "
+          f"({len(outcomes) / elapsed if elapsed else 0:.2f}/s), {stats.get('requests', 0)} requests, "
+          f"{stats.get('retries', 0)} retries, {stats.get('failures', 0)} failures, "
+          f"{len(errors)} partitions failed")
+
+    if args.dry_run:
+        return 1 if errors else 0
+
+    written = 0
+    cache_index = load_cache_index()
+    for league, season, (status, digest) in outcomes:
+        record_fetch(cache_index, partition_key(league, season), digest)
+        if status == "written":
+            hashes[partition_key(league, season)] = digest
+            written += 1
 
-    # Report any failures (network issues, API errors, etc.)
-    for e in errors:
-        print(f"Fetch failed {e}")
+    save_cache_index(cache_index)
+    save_partition_hashes(hashes)
+    print(f"[INFO] Wrote {written} partitions, {len(outcomes) - written} unchanged or empty")
 
-    for league, season, records in successes:
-        df = to_dataframe(league, season, records)
-        if df.empty:
-            print(f"[INFO] No data for {league} {season}")
-            continue
-        write_partitioned_players(df, mode="overwrite")
-        
     # Update metadata
     write_last_update()
+    return 1 if errors else 0
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    sys.exit(asyncio.run(main()))
\ No newline at end of file
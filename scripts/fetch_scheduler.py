@@ -0,0 +1,65 @@
+import asyncio
+import json
+import random
+import time
+import aiohttp
+
+# ---------------------------RATE LIMITING---------------------------
+class TokenBucket:
+    """
+    Token bucket rate limiter for asyncio.
+    - rate: tokens added per second (sustained requests per second)
+    - capacity: bucket size (how many requests may go out back to back)
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self.lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+# ---------------------------RETRIES---------------------------
+# Failures worth another attempt: network errors, timeouts and non-JSON answers
+# (Understat serves an HTML error page when it is unhappy). Anything else, a KeyError
+# from a payload missing a field included, is a bug or a format change: retrying
+# only hides it, so it fails the partition straight away.
+RETRYABLE_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, json.JSONDecodeError)
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+async def call_with_retries(make_call, bucket: TokenBucket, retries: int, timeout: float, stats: dict, label: str = ""):
+    """
+    Run make_call() (a coroutine factory) under the rate limiter with a per-attempt timeout,
+    retrying retryable errors with jittered exponential backoff.
+    stats counts 'requests', 'retries' and 'failures'.
+    """
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        stats["requests"] = stats.get("requests", 0) + 1
+        try:
+            return await asyncio.wait_for(make_call(), timeout=timeout)
+        except RETRYABLE_ERRORS as e:
+            if attempt == retries:
+                stats["failures"] = stats.get("failures", 0) + 1
+                raise
+            stats["retries"] = stats.get("retries", 0) + 1
+            delay = backoff_delay(attempt)
+            print(f"[RETRY] {label} attempt {attempt + 1} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
@@ -0,0 +1,220 @@
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+import aiohttp
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+# Statuses that end an interaction (an st.rerun() inside a fragment ends early, then reruns)
+DONE = {ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY}
+
+# Seconds a rerun may take before the measurement gives up
+RERUN_TIMEOUT = 120
+
+# Where results are written by default (gitignored, shared with scripts/benchmark.py)
+RESULTS_DIR = Path("benchmarks")
+
+# Players picked before timing the chart options
+PLAYERS = ["Bukayo Saka", "Harry Kane"]
+
+# ---------------------------CLIENT---------------------------
+class AppClient:
+    """
+    Minimal Streamlit browser stand-in over the app's websocket: keeps the widget
+    states of the last run and, like the frontend, reruns only the fragment a
+    changed widget belongs to.
+    """
+
+    def __init__(self, ws, page):
+        self.ws = ws
+        self.page = page
+        self.page_script_hash = ""
+        self.widgets = {}   # label -> (element type, widget proto, fragment id)
+        self.states = {}    # widget id -> WidgetState
+
+    async def run(self, fragment_id=""):
+        """Send a rerun and wait for it to finish; returns the round trip in seconds."""
+        msg = BackMsg()
+        msg.rerun_script.page_name = self.page.replace(" ", "_")  # URL path name of the page
+        msg.rerun_script.page_script_hash = self.page_script_hash
+        msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+
+        start = time.perf_counter()
+        await self.ws.send_bytes(msg.SerializeToString())
+        while True:
+            received = await self.ws.receive(timeout=RERUN_TIMEOUT)
+            if received.type != aiohttp.WSMsgType.BINARY:
+                raise RuntimeError(f"websocket closed: {received.type}")
+            fwd = ForwardMsg()
+            fwd.ParseFromString(received.data)
+            kind = fwd.WhichOneof("type")
+            if kind == "navigation":
+                # Later reruns (and st.rerun() from a fragment) must stay on this page
+                self.page_script_hash = fwd.navigation.page_script_hash
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                element_type = element.WhichOneof("type")
+                proto = getattr(element, element_type)
+                if getattr(proto, "id", "") and getattr(proto, "label", ""):
+                    self.widgets[proto.label] = (element_type, proto, fwd.delta.fragment_id)
+            elif kind == "script_finished" and fwd.script_finished in DONE:
+                return time.perf_counter() - start
+
+    def _state(self, label):
+        _, proto, fragment_id = self.widgets[label]
+        state = WidgetState(id=proto.id)
+        return state, fragment_id
+
+    async def select(self, label, option_prefix):
+        """Pick the first selectbox option starting with option_prefix."""
+        state, fragment_id = self._state(label)
+        state.string_value = next(o for o in self.widgets[label][1].options if o.startswith(option_prefix))
+        self.states[state.id] = state
+        return await self.run(fragment_id)
+
+    async def toggle(self, label, value):
+        state, fragment_id = self._state(label)
+        state.bool_value = value
+        self.states[state.id] = state
+        return await self.run(fragment_id)
+
+    async def select_index(self, label, index):
+        state, fragment_id = self._state(label)
+        options = self.widgets[label][1].options
+        state.string_value = options[index % len(options)]
+        self.states[state.id] = state
+        return await self.run(fragment_id)
+
+    async def slide(self, label, value):
+        state, fragment_id = self._state(label)
+        state.double_array_value.data.append(value)
+        self.states[state.id] = state
+        return await self.run(fragment_id)
+
+# ---------------------------SCENARIOS---------------------------
+async def comparison_page(client, repeat):
+    """Pick two players, then flip "Per 90 mins" back and forth."""
+    await client.run()
+    for slot, name in enumerate(PLAYERS, start=1):
+        await client.select(f"Select Player {slot}", name)
+    # First flips build both figures; time the steady state
+    await client.toggle("Per 90 mins", True)
+    await client.toggle("Per 90 mins", False)
+    return {"Per 90 mins toggle": [await client.toggle("Per 90 mins", i % 2 == 0) for i in range(repeat)]}
+
+async def profile_page(client, repeat):
+    """Pick two players, then cycle the radar cohort and the number of similar players."""
+    await client.run()
+    for slot, name in enumerate(PLAYERS, start=1):
+        await client.select(f"Select Player {slot}", name)
+    cohorts = len(client.widgets["Compare against"][1].options)
+    for i in range(cohorts):
+        await client.select_index("Compare against", i)
+    return {
+        "Radar cohort change": [await client.select_index("Compare against", i) for i in range(repeat)],
+        "Similar players count": [await client.slide("Number of players", 5 + i % 20) for i in range(repeat)],
+    }
+
+SCENARIOS = {
+    "Finishing": comparison_page,
+    "Creativity": comparison_page,
+    "Build Up Play": comparison_page,
+    "Player Profile": profile_page,
+}
+
+# ---------------------------SERVER---------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def wait_for_server(session, url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{url}/_stcore/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("streamlit server did not start")
+
+async def measure(app_dir, pages, repeat):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "🏠_Home.py", "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=app_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    results = {}
+    try:
+        async with aiohttp.ClientSession() as session:
+            await wait_for_server(session, url)
+            for page in pages:
+                # One session per page, as a user opening it in a new tab
+                async with session.ws_connect(f"ws://127.0.0.1:{port}/_stcore/stream",
+                                              protocols=["streamlit"], max_msg_size=0) as ws:
+                    timings = await SCENARIOS[page](AppClient(ws, page), repeat)
+                results[page] = {
+                    interaction: {
+                        "median_ms": statistics.median(t) * 1000,
+                        "min_ms": min(t) * 1000,
+                        "repeat": len(t),
+                    }
+                    for interaction, t in timings.items()
+                }
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+# ---------------------------MAIN---------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time chart-option interactions end to end (websocket round trip of the rerun) "
+                    "against a local `streamlit run`, optionally for a second checkout to compare.")
+    parser.add_argument("--app-dir", default=".", help="checkout to measure")
+    parser.add_argument("--baseline-dir", default=None,
+                        help="another checkout (e.g. a git worktree of an older commit) to compare with")
+    parser.add_argument("--pages", default=",".join(SCENARIOS), help="comma-separated pages")
+    parser.add_argument("--repeat", type=int, default=20, help="timed interactions per page")
+    parser.add_argument("--output", default=str(RESULTS_DIR / "interaction_latency.json"),
+                        help="JSON file the results are written to")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    pages = [p.strip() for p in args.pages.split(",") if p.strip()]
+
+    report = {}
+    for name, app_dir in [("baseline", args.baseline_dir), ("app", args.app_dir)]:
+        if app_dir is None:
+            continue
+        print(f"[INFO] Measuring {name}: {Path(app_dir).resolve()}")
+        report[name] = asyncio.run(measure(app_dir, pages, args.repeat))
+
+    for page in pages:
+        for interaction, timing in report["app"][page].items():
+            line = f"  {page:<15} {interaction:<24} median {timing['median_ms']:8.1f} ms"
+            if "baseline" in report:
+                before = report["baseline"][page][interaction]["median_ms"]
+                line += f"   (baseline {before:8.1f} ms, {before / timing['median_ms']:.1f}x)"
+            print(line)
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[INFO] Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
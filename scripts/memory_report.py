@@ -0,0 +1,30 @@
+import argparse
+import pandas as pd
+from constants import PARQUET_PATH
+from utils.data_loader import load_understat_data
+from utils.format import clean_html_entities
+from utils.memory import compact_frame, memory_report
+
+# ---------------------------MAIN---------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare per-column memory of the default and compact frame layouts.")
+    parser.add_argument("--base-dir", default=PARQUET_PATH, help="root of the league=*/season=* tree")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    before = clean_html_entities(load_understat_data(args.base_dir), ["player_name", "team_title"])
+    after = compact_frame(before)
+
+    report = memory_report(before, after)
+    with pd.option_context("display.max_rows", None, "display.width", 120):
+        print(report.to_string(float_format=lambda v: f"{v:.1f}"))
+
+    if args.json:
+        report.to_json(args.json, orient="index", indent=2)
+        print(f"[OK] Wrote report to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.partitioned_parquet import DATA_DIR, WRITE_OPTIONS
+from utils.manifest import live_part_files
+from scripts.fetch_player_data import PER_90_COLS, _to_per90
+
+# Counting stats drawn as integers, the rest (xG, xA, ...) stay continuous
+INT_COLS = ["goals", "assists", "shots", "key_passes", "npg", "red_cards", "yellow_cards"]
+FLOAT_COLS = ["xG", "xA", "npxG", "xGChain", "xGBuildup"]
+
+# ---------------------------SCALE---------------------------
+def scale_players(df, factor, seed=0):
+    """
+    Grow a league-season frame to factor x its rows with realistic distributions.
+    Copy 0 is the real data; copy c >= 1 is a made-up player per real player
+    ("<name> (c)", id "<id>-c", same team, position and career) whose minutes are
+    resampled around the original and whose stats keep the original per-minute
+    rates with noise (Poisson for counts, log-normal for expected-goal values).
+    Per-90 columns are recomputed the same way as the fetcher does.
+    """
+    rng = np.random.default_rng(seed)
+    copies = [df]
+
+    games = df["games"].to_numpy(dtype="float64")
+    minutes = df["time"].to_numpy(dtype="float64")
+    for c in range(1, factor):
+        copy = df.copy()
+        copy["player_name"] = copy["player_name"] + f" ({c})"
+        copy["id"] = copy["id"].astype(str) + f"-{c}"
+
+        scale = rng.lognormal(0.0, 0.35, len(df))
+        new_minutes = np.clip(np.round(minutes * scale), 0, np.maximum(games, 1) * 90)
+        ratio = np.where(minutes > 0, new_minutes / np.where(minutes > 0, minutes, 1), 0.0)
+        copy["time"] = new_minutes.astype("int64")
+
+        for col in INT_COLS:
+            if col in copy.columns:
+                copy[col] = rng.poisson(copy[col].to_numpy(dtype="float64") * ratio)
+        if "npg" in copy.columns and "goals" in copy.columns:
+            copy["npg"] = np.minimum(copy["npg"], copy["goals"])
+        for col in FLOAT_COLS:
+            if col in copy.columns:
+                noise = rng.lognormal(0.0, 0.2, len(df))
+                copy[col] = copy[col].to_numpy(dtype="float64") * ratio * noise
+        copies.append(copy)
+
+    scaled = pd.concat(copies, ignore_index=True)
+    for col in PER_90_COLS:
+        scaled = scaled.drop(columns=col + "_per90", errors="ignore")
+    return _to_per90(scaled, PER_90_COLS)
+
+def write_synthetic_dataset(out_dir, factor, base_dir=DATA_DIR, seed=0):
+    """
+    Write a league=*/season=* tree factor x the size of base_dir, one partition at a time
+    (only one scaled partition is in memory). Returns the number of rows written.
+    """
+    out_dir = Path(out_dir)
+    rows = 0
+    partitions = sorted(Path(base_dir).glob("league=*/season=*"))
+    for i, partition in enumerate(partitions):
+        files = live_part_files(partition)
+        if not files:
+            continue
+        df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+        scaled = scale_players(df, factor, seed=seed * 1_000_003 + i)
+
+        target = out_dir / partition.relative_to(base_dir)
+        target.mkdir(parents=True, exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(scaled, preserve_index=False),
+                       target / "part-synthetic.parquet", **WRITE_OPTIONS)
+        rows += len(scaled)
+    return rows
+
+# ---------------------------MAIN---------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic Understat tree scaled from the real one.")
+    parser.add_argument("out_dir", help="where to write the league=*/season=* tree")
+    parser.add_argument("--factor", type=int, default=10, help="row multiplier")
+    parser.add_argument("--base-dir", default=str(DATA_DIR), help="real tree to scale")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    rows = write_synthetic_dataset(args.out_dir, args.factor, args.base_dir, args.seed)
+    print(f"[INFO] Wrote {rows} rows to {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
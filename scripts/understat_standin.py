@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import json
+import random
+from pathlib import Path
+import pyarrow.parquet as pq
+from aiohttp import web
+from utils.partitioned_parquet import DATA_DIR
+from utils.manifest import live_part_files
+
+# Raw fields of an Understat league-player record, in the order the API sends them
+RAW_FIELDS = ["id", "player_name", "games", "time", "goals", "xG", "assists", "xA", "shots",
+              "key_passes", "yellow_cards", "red_cards", "position", "team_title",
+              "npg", "npxG", "xGChain", "xGBuildup"]
+
+# ---------------------------PAYLOADS---------------------------
+def load_recorded_payload(payload_dir: Path, league: str, season: str):
+    """Recorded payload <payload_dir>/<league>_<season>.json (a list of player records), or None."""
+    path = payload_dir / f"{league}_{season}.json"
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def payload_from_partition(base_dir: Path, league: str, season: str):
+    """
+    Rebuild a league-player payload from a local Parquet partition, or None if it is missing.
+    Values are strings, as Understat sends them.
+    """
+    path = base_dir / f"league={league}" / f"season={season}"
+    files = live_part_files(path) if path.exists() else []
+    if not files:
+        return None
+    records = []
+    for file in files:
+        table = pq.read_table(file, columns=[c for c in RAW_FIELDS if c in pq.read_schema(file).names])
+        for row in table.to_pylist():
+            records.append({k: "" if v is None else str(v) for k, v in row.items()})
+    return records
+
+# ---------------------------SERVER---------------------------
+def make_app(base_dir=DATA_DIR, payload_dir=None, latency=0.2, jitter=0.1, error_rate=0.0, stall_rate=0.0):
+    """
+    aiohttp app answering GET /getLeagueData/{league}/{season} like Understat.
+    - latency/jitter: seconds added to every response (uniform in latency +- jitter)
+    - error_rate: share of requests answered with a 503 HTML page
+    - stall_rate: share of requests that hang long enough to hit the client timeout
+    Payloads are read once per league-season and kept in memory.
+    """
+    cache = {}
+    counters = {"requests": 0, "errors": 0, "stalls": 0}
+
+    def payload(league, season):
+        key = (league, season)
+        if key not in cache:
+            records = load_recorded_payload(Path(payload_dir), league, season) if payload_dir else None
+            if records is None:
+                records = payload_from_partition(Path(base_dir), league, season)
+            cache[key] = None if records is None else json.dumps({"players": records})
+        return cache[key]
+
+    async def league_data(request):
+        counters["requests"] += 1
+        await asyncio.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+
+        roll = random.random()
+        if roll < stall_rate:
+            counters["stalls"] += 1
+            await asyncio.sleep(3600)
+        if roll < stall_rate + error_rate:
+            counters["errors"] += 1
+            return web.Response(status=503, text="<html><body>Service Unavailable</body></html>",
+                                content_type="text/html")
+
+        body = payload(request.match_info["league"], request.match_info["season"])
+        if body is None:
+            # Understat answers unknown league-seasons with an empty player list
+            body = json.dumps({"players": []})
+        return web.Response(text=body, content_type="application/json")
+
+    async def stats(request):
+        return web.json_response(counters)
+
+    app = web.Application()
+    app.router.add_get("/getLeagueData/{league}/{season}", league_data)
+    app.router.add_get("/_stats", stats)
+    return app
+
+# ---------------------------MAIN---------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Local Understat stand-in for offline fetch benchmarks "
+                    "(use with: python -m scripts.fetch_player_data --base-url http://127.0.0.1:<port>).")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--base-dir", default=str(DATA_DIR),
+                        help="Parquet tree the payloads are rebuilt from")
+    parser.add_argument("--payload-dir",
+                        help="directory of recorded <league>_<season>.json payloads (preferred over --base-dir)")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+- seconds of random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 503")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="share of requests that never answer")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = make_app(args.base_dir, args.payload_dir, args.latency, args.jitter, args.error_rate, args.stall_rate)
+    web.run_app(app, host="127.0.0.1", port=args.port)
+
+if __name__ == "__main__":
+    main()
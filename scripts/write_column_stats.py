@@ -0,0 +1,30 @@
+import argparse
+from pathlib import Path
+import pandas as pd
+from utils.manifest import live_part_files
+from utils.column_stats import compute_column_stats, write_column_stats
+from utils.partitioned_parquet import DATA_DIR
+
+# ---------------------------MAIN---------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="(Re)write the column statistics sidecar of every league/season partition "
+                    "(new writes produce it already; this backfills existing partitions).")
+    parser.add_argument("--base-dir", default=str(DATA_DIR),
+                        help="root of the league=*/season=* tree")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    written = 0
+    for path in sorted(Path(args.base_dir).glob("league=*/season=*")):
+        files = live_part_files(path)
+        if not files:
+            continue
+        df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+        write_column_stats(path, compute_column_stats(df))
+        written += 1
+    print(f"[INFO] Wrote column statistics for {written} partitions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.column_stats import QUANTILES, compute_column_stats, merge_column_stats, footer_column_stats
+
+EXACT = ["count", "nulls", "min", "max"]
+
+def partition_parts(seed=2):
+    """Parts of different sizes: NaNs, an all-null column, an empty part, a column missing from one part."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for n in [400, 37, 1200, 0, 5]:
+        df = pd.DataFrame({
+            "time": rng.integers(0, 3400, n),
+            "goals": rng.integers(0, 25, n).astype("float64"),
+            "xG": rng.gamma(2.0, 2.0, n),
+            "player_name": pd.Series([f"Player {i}" for i in range(n)], dtype=object),
+        })
+        df.loc[rng.random(n) < 0.1, "goals"] = np.nan
+        parts.append(df)
+    parts[1]["xG"] = np.nan
+    parts[4] = parts[4].drop(columns="goals")
+    return parts
+
+def test_merge_is_exact_for_counts_and_bounds():
+    parts = partition_parts()
+    merged = merge_column_stats([compute_column_stats(df) for df in parts])
+    expected = compute_column_stats(pd.concat(parts, ignore_index=True))
+
+    assert set(merged) == set(expected) == {"time", "goals", "xG"}
+    for col in expected:
+        # a column missing from a part is not counted for that part
+        count = sum(len(df) for df in parts if col in df.columns)
+        assert merged[col]["count"] == count
+        assert merged[col]["nulls"] == expected[col]["nulls"] - (len(parts[4]) if col == "goals" else 0)
+        assert merged[col]["min"] == expected[col]["min"]
+        assert merged[col]["max"] == expected[col]["max"]
+
+def test_merge_of_one_part_is_the_part():
+    df = partition_parts()[0]
+    stats = compute_column_stats(df)
+    merged = merge_column_stats([stats])
+    for col, s in stats.items():
+        assert {k: merged[col][k] for k in EXACT} == {k: s[k] for k in EXACT}
+        assert merged[col]["quantiles"] == pytest.approx(s["quantiles"])
+
+def test_merged_quantiles_approximate_the_concatenated_frame():
+    parts = partition_parts()
+    merged = merge_column_stats([compute_column_stats(df) for df in parts])
+    expected = compute_column_stats(pd.concat(parts, ignore_index=True))
+
+    for col in ["time", "goals", "xG"]:
+        values = [merged[col]["quantiles"][str(q)] for q in QUANTILES]
+        # Monotonic, inside the exact bounds, and close to the true quantiles for parts drawn alike
+        assert values == sorted(values)
+        assert merged[col]["min"] <= values[0] and values[-1] <= merged[col]["max"]
+        spread = expected[col]["max"] - expected[col]["min"]
+        for q in QUANTILES:
+            assert merged[col]["quantiles"][str(q)] == pytest.approx(expected[col]["quantiles"][str(q)],
+                                                                     abs=0.05 * spread)
+
+def test_all_null_parts_do_not_weigh_on_quantiles():
+    parts = partition_parts()
+    with_null = merge_column_stats([compute_column_stats(df) for df in parts[:3]])
+    without_null = merge_column_stats([compute_column_stats(df) for df in [parts[0], parts[2]]])
+    assert with_null["xG"]["quantiles"] == pytest.approx(without_null["xG"]["quantiles"])
+    assert with_null["xG"]["nulls"] == without_null["xG"]["nulls"] + len(parts[1])
+
+def test_footer_stats_match_computed_stats(tmp_path):
+    parts = [df for df in partition_parts() if len(df) and "goals" in df.columns]
+    for i, df in enumerate(parts):
+        df.to_parquet(tmp_path / f"part-{i}.parquet", index=False, row_group_size=300)
+
+    footer = footer_column_stats(tmp_path)
+    expected = compute_column_stats(pd.concat(parts, ignore_index=True))
+
+    for col in expected:
+        assert {k: footer[col][k] for k in EXACT} == {k: expected[col][k] for k in EXACT}
+        assert footer[col]["quantiles"] is None
@@ -0,0 +1,24 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from scripts.fetch_player_data import process_queue
+
+def test_process_queue_records_processing_failures():
+    def process(league, season, records):
+        if season == 2021:
+            raise ValueError("bad payload")
+        return "written", "digest"
+
+    async def run():
+        queue = asyncio.Queue()
+        for season in (2020, 2021, 2022):
+            queue.put_nowait(("EPL", season, []))
+        queue.put_nowait(None)
+        results, errors = [], []
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            await process_queue(queue, pool, process, results, errors)
+        return results, errors
+
+    results, errors = asyncio.run(run())
+    assert [(league, season) for league, season, _ in results] == [("EPL", 2020), ("EPL", 2022)]
+    assert [(league, season) for league, season, _ in errors] == [("EPL", 2021)]
+    assert isinstance(errors[0][2], ValueError)
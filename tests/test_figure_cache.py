@@ -0,0 +1,72 @@
+from collections import OrderedDict
+import plotly.graph_objects as go
+import pytest
+from utils.figure_cache import get_figure_cache, figure_key, cached_figure, figure_cache_stats
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    get_figure_cache.clear()
+    yield
+    get_figure_cache.clear()
+
+def builder(name, calls):
+    def build():
+        calls.append(name)
+        return go.Figure(go.Bar(x=[name], y=[len(name)]), layout={"title": {"text": name}})
+    return build
+
+def test_cached_figure_matches_a_reference_lru():
+    """Random lookups against an OrderedDict LRU: same hits, misses, evictions and entries."""
+    keys = [f"fig {i}" for i in (3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5, 8, 9, 7, 9, 3, 2, 3, 8, 4, 6, 2, 6, 4, 3)]
+    calls, reference, misses, evictions = [], OrderedDict(), [], 0
+
+    for key in keys:
+        fig = cached_figure(key, builder(key, calls), max_entries=4)
+        assert fig.layout.title.text == key
+
+        if key in reference:
+            reference.move_to_end(key)
+        else:
+            misses.append(key)
+            reference[key] = True
+            if len(reference) > 4:
+                reference.popitem(last=False)
+                evictions += 1
+
+    assert calls == misses
+    assert list(get_figure_cache()["entries"]) == list(reference)
+    stats = figure_cache_stats()
+    assert stats == {
+        "hits": len(keys) - len(misses),
+        "misses": len(misses),
+        "hit_rate": round((len(keys) - len(misses)) / len(keys), 3),
+        "entries": 4,
+        "evictions": evictions,
+    }
+
+def test_cached_figures_are_not_shared():
+    calls = []
+    first = cached_figure("key", builder("a", calls))
+    first.update_layout(title_text="changed in one session")
+    second = cached_figure("key", builder("a", calls))
+    assert calls == ["a"]
+    assert second.layout.title.text == "a"
+    assert second is not first
+
+def test_none_is_not_cached():
+    calls = []
+    assert cached_figure("empty", lambda: calls.append("empty")) is None
+    assert cached_figure("empty", lambda: calls.append("empty")) is None
+    assert calls == ["empty", "empty"]
+    assert figure_cache_stats()["entries"] == 0
+
+def test_figure_key_covers_every_input():
+    base = dict(data_version="v1", chart="radar", selections=[("A", ["2023"]), ("B", [])],
+                stats=["goals", "xG"], stat_type="per90", cohort="All players")
+    key = figure_key(**base)
+    assert figure_key(**base) == key
+    hash(key)
+    for change in [{"data_version": "v2"}, {"chart": "bar"}, {"selections": [("A", ["2022"]), ("B", [])]},
+                   {"selections": [("B", []), ("A", ["2023"])]}, {"stats": ["xG", "goals"]},
+                   {"stat_type": "total"}, {"cohort": "Same league"}]:
+        assert figure_key(**{**base, **change}) != key
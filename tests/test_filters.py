@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.filters import build_filter_index, selection_mask, combine_masks, available_options, stat_mask
+from utils.percentiles import position_group
+
+def filter_rows(n=500, seed=5):
+    """Random rows over the Find Players filter columns, with missing values."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "season": rng.choice(["2020/2021", "2021/2022", "2022/2023"], n),
+        "league": rng.choice(["Premier League", "Serie A", "La Liga", "Ligue 1"], n),
+        "team_title": rng.choice([f"Team {i:02d}" for i in range(25)], n),
+        "position": rng.choice(["F", "M", "D", "F M", "D S", "GK"], n).astype(object),
+    })
+    df.loc[rng.choice(n, 30, replace=False), "position"] = None
+    df.loc[rng.choice(n, 10, replace=False), "team_title"] = np.nan
+    return df
+
+SELECTIONS = [
+    {"season": ["2021/2022"]},
+    {"season": ["2020/2021", "2022/2023"], "league": ["Serie A", "Ligue 1"]},
+    {"league": ["La Liga"], "team_title": ["Team 03", "Team 07", "Team 99"], "position": ["F", "D S"]},
+    {"position": ["GK", "Not a position"]},
+    {"season": [], "league": None},
+]
+
+def index_mask(index, selection):
+    return combine_masks(*(selection_mask(index, col, values) for col, values in selection.items()))
+
+def pandas_mask(df, selection):
+    mask = pd.Series(True, index=df.index)
+    for col, values in selection.items():
+        if values:
+            mask &= df[col].isin(values)
+    return mask.to_numpy()
+
+@pytest.mark.parametrize("categorical", [False, True])
+@pytest.mark.parametrize("selection", SELECTIONS)
+def test_selection_masks_match_isin(selection, categorical):
+    df = filter_rows()
+    if categorical:
+        df = df.astype("category")
+    index = build_filter_index(df)
+
+    mask = index_mask(index, selection)
+    if not any(selection.values()):
+        assert mask is None
+    else:
+        np.testing.assert_array_equal(mask, pandas_mask(df, selection))
+
+@pytest.mark.parametrize("categorical", [False, True])
+@pytest.mark.parametrize("selection", SELECTIONS)
+def test_available_options_match_filtered_uniques(selection, categorical):
+    df = filter_rows()
+    if categorical:
+        df = df.astype("category")
+    index = build_filter_index(df)
+    mask = index_mask(index, selection)
+
+    rows = df if mask is None else df[pandas_mask(df, selection)]
+    for col in ["season", "league", "team_title", "position"]:
+        assert available_options(index, col, mask) == sorted(rows[col].dropna().unique())
+
+def test_filter_index_codes_round_trip():
+    df = filter_rows()
+    index = build_filter_index(df)
+    assert index["rows"] == len(df)
+    for col in ["season", "league", "team_title", "position"]:
+        entry = index[col]
+        decoded = [entry["values"][c] if c >= 0 else None for c in entry["codes"]]
+        assert decoded == [None if pd.isna(v) else v for v in df[col]]
+
+def stat_rows(n=800, seed=9):
+    """Random per-player stats with heavy ties, NaNs and a string-typed column."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "league": rng.choice(["EPL", "Serie_A", "La_liga"], n),
+        "position": rng.choice(["F", "F S", "M", "M S", "D"], n),
+        "time": rng.integers(0, 3400, n),
+        "goals": rng.integers(0, 12, n).astype("float64"),
+        "xG": rng.uniform(0, 10, n).round(1),
+        "shots": rng.integers(0, 60, n).astype(str).astype(object),
+    })
+    df.loc[rng.choice(n, 60, replace=False), "goals"] = np.nan
+    df.loc[rng.choice(n, 60, replace=False), "xG"] = np.nan
+    df.loc[rng.choice(n, 20, replace=False), "shots"] = "n/a"
+    return df
+
+RANGES = [
+    [],
+    [("time", 0, None)],
+    [("time", 900, None)],
+    [("goals", 3, 7)],
+    [("time", 1800, None), ("goals", None, 2), ("xG", 1.5, 4.0)],
+    [("xG", 4.0, 4.0), ("shots", 10, None)],
+    [("goals", 20, None)],
+    [("not_a_column", 5, None), ("goals", 1, None)],
+]
+
+def pandas_ranges(df, ranges):
+    """Brute force: one boolean filter per predicate with pandas comparisons."""
+    mask = pd.Series(True, index=df.index)
+    for col, lo, hi in ranges:
+        if col not in df.columns or ((lo is None or lo <= 0) and hi is None):
+            continue
+        values = pd.to_numeric(df[col], errors="coerce")
+        mask &= values.notna()
+        if lo is not None and lo > 0:
+            mask &= values >= lo
+        if hi is not None:
+            mask &= values <= hi
+    return mask.to_numpy()
+
+def pandas_top(df, col, pct, cohort_col):
+    """Brute force: a row is in the top pct% if at most pct% of its cohort's values are >= its value."""
+    values = pd.to_numeric(df[col], errors="coerce")
+    cohorts = pd.Series("all", index=df.index) if cohort_col is None else df[cohort_col]
+    if cohort_col == "position":
+        cohorts = cohorts.map(position_group)
+    keep = np.zeros(len(df), dtype=bool)
+    for i, (v, cohort) in enumerate(zip(values, cohorts)):
+        if pd.isna(v):
+            continue
+        pool = values[(cohorts == cohort) & values.notna()]
+        keep[i] = (pool >= v).sum() / len(pool) <= pct / 100
+    return keep
+
+@pytest.mark.parametrize("with_index", [False, True])
+@pytest.mark.parametrize("ranges", RANGES)
+def test_stat_mask_matches_pandas_filters(ranges, with_index):
+    df = stat_rows()
+    expected = pandas_ranges(df, ranges)
+    mask = stat_mask(df, ranges, sorted_index={} if with_index else None)
+
+    # Nothing constrains: no predicates, or only a minimum of 0
+    if ranges in ([], [("time", 0, None)]):
+        assert mask is None
+    else:
+        np.testing.assert_array_equal(mask, expected)
+
+def test_stat_mask_sorted_index_is_reused():
+    df = stat_rows()
+    sorted_index = {}
+    first = stat_mask(df, RANGES[4], sorted_index=sorted_index)
+    assert set(sorted_index) == {"time", "goals", "xG"}
+    again = stat_mask(df, RANGES[4], sorted_index=sorted_index)
+    np.testing.assert_array_equal(first, again)
+    np.testing.assert_array_equal(first, pandas_ranges(df, RANGES[4]))
+
+@pytest.mark.parametrize("with_index", [False, True])
+@pytest.mark.parametrize("cohort_col", [None, "league", "position"])
+@pytest.mark.parametrize("pct", [1, 10, 50, 100])
+def test_stat_mask_top_pct_matches_brute_force(pct, cohort_col, with_index):
+    df = stat_rows()
+    ranges = [("time", 900, None)]
+    mask = stat_mask(df, ranges, top_pct=("goals", pct, cohort_col), sorted_index={} if with_index else None)
+
+    # The ranking is over every row; the other predicates are applied on top
+    expected = pandas_ranges(df, ranges)
+    if pct < 100:
+        expected &= pandas_top(df, "goals", pct, cohort_col)
+    np.testing.assert_array_equal(mask, expected)
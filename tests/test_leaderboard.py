@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.leaderboard import top_k, top_k_by_group
+
+def player_table(n=400, seed=7):
+    """Few distinct values per stat, so ties are everywhere; some NaNs and low-minute players."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "player_name": [f"Player {i:03d}" for i in range(n)],
+        "league": rng.choice(["EPL", "La_liga", "Serie_A"], n),
+        "goals": rng.integers(0, 6, n).astype("float64"),
+        "assists": rng.integers(0, 4, n).astype("float64"),
+        "time": rng.integers(0, 3000, n),
+    })
+    df.loc[rng.choice(n, 25, replace=False), "goals"] = np.nan
+    df.loc[rng.choice(n, 25, replace=False), "assists"] = np.nan
+    return df
+
+def reference(df, stat_cols, n, min_minutes=0):
+    """The leaderboard before top_k: full sort, then head(n), with a stable sort on ties."""
+    eligible = df[df["time"] >= min_minutes] if min_minutes else df
+    ranked = eligible.reset_index().sort_values(stat_cols, ascending=False, kind="stable", na_position="last")
+    return ranked["index"].to_numpy()[:n]
+
+@pytest.mark.parametrize("stat_cols", [["goals"], ["goals", "assists"], ["assists", "goals"]])
+@pytest.mark.parametrize("n", [1, 10, 50])
+@pytest.mark.parametrize("min_minutes", [0, 900])
+def test_top_k_matches_stable_sort(stat_cols, n, min_minutes):
+    df = player_table()
+    expected = reference(df, stat_cols, n, min_minutes)
+    np.testing.assert_array_equal(top_k(df, stat_cols, n=n, min_minutes=min_minutes), expected)
+
+def test_top_k_single_column_ties_keep_frame_order():
+    df = pd.DataFrame({"player_name": list("abcdef"), "goals": [3, 5, 3, 5, np.nan, 3], "time": 900})
+    # 5s first, then 3s, each in frame order; NaN last
+    np.testing.assert_array_equal(top_k(df, ["goals"], n=6), [1, 3, 0, 2, 5, 4])
+    np.testing.assert_array_equal(top_k(df, ["goals"], n=3), [1, 3, 0])
+
+def test_top_k_by_group_matches_top_k_per_group():
+    df = player_table()
+    groups = top_k_by_group(df, ["goals", "assists"], df["league"], n=10, min_minutes=900)
+    assert list(groups) == ["EPL", "La_liga", "Serie_A"]
+    for league, positions in groups.items():
+        rows = np.flatnonzero(df["league"] == league)
+        expected = rows[top_k(df.iloc[rows], ["goals", "assists"], n=10, min_minutes=900)]
+        np.testing.assert_array_equal(positions, expected)
@@ -0,0 +1,79 @@
+import threading
+import pandas as pd
+import pytest
+import utils.partitioned_parquet as pp
+from utils.data_loader import _read_understat_data
+from utils.manifest import live_part_files
+
+N_PARTS = 4
+ROWS_PER_PART = 250
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pp, "DATA_DIR", tmp_path)
+    return tmp_path
+
+def players(start, n, league="EPL", season="2024"):
+    ids = range(start, start + n)
+    return pd.DataFrame({
+        "id": [str(i) for i in ids],
+        "player_name": [f"Player {i:05d}" for i in ids],
+        "goals": [i % 7 for i in ids],
+        "league": league,
+        "season": season,
+    })
+
+def test_append_then_overwrite_keeps_only_new_rows(data_dir):
+    for i in range(N_PARTS):
+        pp.write_partitioned_players(players(i * ROWS_PER_PART, ROWS_PER_PART))
+    path = pp.partition_path("EPL", "2024")
+    assert len(live_part_files(path)) == N_PARTS
+
+    pp.write_partitioned_players(players(0, 10), mode="overwrite")
+    assert len(live_part_files(path)) == 1
+    assert len(list(path.glob("*.parquet"))) == 1
+    assert len(_read_understat_data(data_dir)) == 10
+
+def test_reads_during_multi_part_compaction_see_every_row_once(data_dir):
+    n_rows = N_PARTS * ROWS_PER_PART
+    pp.write_partitioned_players(players(0, 100, season="2023"))
+    for i in range(N_PARTS):
+        pp.write_partitioned_players(players(i * ROWS_PER_PART, ROWS_PER_PART))
+    path = pp.partition_path("EPL", "2024")
+    expected = n_rows + 100
+
+    done = threading.Event()
+    failures = []
+
+    def compact_repeatedly():
+        try:
+            for _ in range(15):
+                # Split the compacted file into parts again (one swap), then compact them
+                df = _read_understat_data(data_dir, seasons=["2024"]).drop(columns=["league", "season"])
+                parts = []
+                for i in range(N_PARTS):
+                    chunk = df.iloc[i * ROWS_PER_PART:(i + 1) * ROWS_PER_PART]
+                    target = path / pp._new_part_name()
+                    pp._write_atomic(pp.pa.Table.from_pandas(chunk, preserve_index=False), target)
+                    parts.append(target)
+                pp._publish(path, parts, replaced=live_part_files(path))
+                assert pp.compact_partition(path) == N_PARTS
+        except Exception as e:
+            failures.append(e)
+        finally:
+            done.set()
+
+    writer = threading.Thread(target=compact_repeatedly)
+    writer.start()
+    reads = 0
+    while not done.is_set():
+        df = _read_understat_data(data_dir)
+        assert len(df) == expected
+        assert not df.duplicated(["season", "id"]).any()
+        reads += 1
+    writer.join()
+
+    assert not failures, failures
+    assert reads > 0
+    assert len(live_part_files(path)) == 1
+    assert len(list(path.glob("*.parquet"))) == 1
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+from utils.players import aggregate_player_rows
+
+def player_rows():
+    """Multi-season players, a mid-career move inside one season, NaNs and a player without minutes."""
+    rows = [
+        # player_name, team_title, league, season, position, time, games, goals, xG, shots
+        ("Alpha", "Arsenal", "EPL", "2021", "F", 1800, 22, 10, 8.5, 50),
+        ("Alpha", "Arsenal", "EPL", "2022", "F", 600, 8, 3, np.nan, 15),
+        ("Alpha", "Roma", "Serie_A", "2022", "F M", 900, 11, 4, 3.2, np.nan),
+        ("Alpha", "Roma", "Serie_A", "2023", "F", 2500, 30, 15, 13.1, 70),
+        ("Bravo", "Lyon", "Ligue_1", "2019", "D", 3000, 34, 1, 0.9, 12),
+        ("Bravo", "Sevilla", "La_liga", "2020", "D", 1200, 15, np.nan, 0.4, 5),
+        ("Bravo", "Lazio", "Serie_A", "2020", "D", 700, 9, 0, np.nan, 2),
+        ("Bravo", "Lazio", "Serie_A", "2021", "D S", 2000, 25, 2, 1.5, 9),
+        ("Charlie", "Mainz", "Bundesliga", "2023", "M", 450, 6, 1, 0.8, 4),
+        ("Delta", "Leeds", "EPL", "2020", "S", 0, 1, 0, 0.0, 0),
+        ("Delta", "Leeds", "EPL", "2021", "S", 0, 2, np.nan, np.nan, 0),
+    ]
+    df = pd.DataFrame(rows, columns=["player_name", "team_title", "league", "season", "position",
+                                     "time", "games", "goals", "xG", "shots"])
+    for col in ["goals", "xG", "shots"]:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df[f"{col}_per90"] = df[col] / df["time"] * 90
+    # Rows in no particular order, as read from several partitions
+    return df.sample(frac=1, random_state=3).reset_index(drop=True)
+
+def accumulate_player_rows(rows, minutes_col="time", per90_suffix="_per90"):
+    """Reference: one player's rows summed in a loop, per-90s recomputed from the totals."""
+    num_cols = rows.select_dtypes(include="number").columns
+    summed = rows[num_cols].sum()
+
+    # Most recent row as template, counting stats set to the totals
+    base = rows.sort_values("season", ascending=False).iloc[0].copy()
+    for col in num_cols:
+        base[col] = summed[col]
+
+    if summed[minutes_col] > 0:
+        denominator = float(summed[minutes_col]) / 90
+        for col in [c for c in num_cols if c.endswith(per90_suffix)]:
+            raw_col = col[: -len(per90_suffix)]
+            if raw_col in summed:
+                base[col] = float(summed[raw_col]) / denominator
+
+    base["season"] = "All seasons"
+    return base
+
+def accumulated(df):
+    """The per-player loop aggregate_player_rows replaced."""
+    rows = [accumulate_player_rows(rows) for _, rows in df.groupby("player_name")]
+    return pd.DataFrame(rows).reset_index(drop=True)
+
+def test_aggregate_player_rows_matches_accumulate_player_rows():
+    df = player_rows()
+    expected = accumulated(df)
+    result = aggregate_player_rows(df).reset_index(drop=True)
+
+    pdt.assert_frame_equal(result, expected.astype(result.dtypes.to_dict()), check_exact=False)
+
+def test_aggregate_player_rows_matches_on_subsets():
+    df = player_rows()
+    for subset in [df[df["league"] == "Serie_A"], df[df["season"].isin(["2020", "2021"])], df.iloc[:3]]:
+        expected = accumulated(subset)
+        result = aggregate_player_rows(subset).reset_index(drop=True)
+        pdt.assert_frame_equal(result, expected.astype(result.dtypes.to_dict()), check_exact=False)
+
+def test_aggregate_player_rows_latest_season_split_across_leagues():
+    df = player_rows()
+    move = pd.DataFrame([{**df.iloc[0].to_dict(), "player_name": "Echo", "team_title": "Porto",
+                          "league": "Other", "season": "2023", "time": 300, "goals": 2}])
+    df = pd.concat([df, move, move.assign(team_title="Ajax", time=500, goals=1)], ignore_index=True)
+
+    expected = accumulated(df).set_index("player_name")
+    result = aggregate_player_rows(df).set_index("player_name")
+
+    # The template of a tied latest season is one of its rows; the totals do not depend on it
+    numeric = result.select_dtypes(include="number").columns
+    pdt.assert_frame_equal(result[numeric], expected[numeric].astype(result[numeric].dtypes.to_dict()),
+                           check_exact=False)
+    assert result.loc["Echo", "team_title"] == "Porto"
+    assert result.loc["Echo", "time"] == 800
@@ -0,0 +1,54 @@
+from utils.partitioned_parquet import payload_hash
+from utils.raw_cache import (object_path, store_payload, load_payload, load_cache_index, save_cache_index,
+                             record_fetch, latest_payloads)
+
+def payload(goals=3):
+    """Understat-like records: strings for numbers, non-ASCII names."""
+    return [
+        {"id": "1", "player_name": "Kylian Mbappé", "games": "30", "goals": str(goals), "xG": "21.4"},
+        {"id": "2", "player_name": "Martin Ødegaard", "games": "35", "goals": "8", "xG": "7.9"},
+    ]
+
+def test_payload_round_trip(tmp_path):
+    records = payload()
+    digest = payload_hash(records)
+    path = store_payload(records, digest, tmp_path)
+
+    assert path == object_path(digest, tmp_path)
+    assert path.parent.name == digest[:2]
+    assert load_payload(digest, tmp_path) == records
+    # Key order does not change the hash, so the same content maps to the same object
+    reordered = [dict(reversed(list(r.items()))) for r in records]
+    assert payload_hash(reordered) == digest
+    assert [p.name for p in tmp_path.rglob("*") if p.is_file()] == [path.name]
+
+def test_store_payload_keeps_existing_object(tmp_path):
+    records = payload()
+    digest = payload_hash(records)
+    path = store_payload(records, digest, tmp_path)
+    mtime = path.stat().st_mtime_ns
+
+    assert store_payload(records, digest, tmp_path) == path
+    assert path.stat().st_mtime_ns == mtime
+
+def test_index_round_trip_and_latest(tmp_path):
+    index_path = tmp_path / "_index.json"
+    assert load_cache_index(index_path) == {}
+
+    first, second, third = (payload_hash(payload(g)) for g in (3, 4, 5))
+    index = {}
+    record_fetch(index, "league=EPL/season=2024", second, fetched="2025-01-12")
+    record_fetch(index, "league=EPL/season=2024", first, fetched="2025-01-05")
+    record_fetch(index, "league=Serie_A/season=2024", first, fetched="2025-01-05")
+    # A second fetch the same day replaces the first one
+    record_fetch(index, "league=EPL/season=2024", third, fetched="2025-01-12")
+    save_cache_index(index, index_path)
+
+    loaded = load_cache_index(index_path)
+    assert loaded == index
+    assert [e["fetched"] for e in loaded["league=EPL/season=2024"]] == ["2025-01-05", "2025-01-12"]
+
+    assert latest_payloads(loaded) == {"league=EPL/season=2024": third, "league=Serie_A/season=2024": first}
+    assert latest_payloads(loaded, as_of="2025-01-11") == {"league=EPL/season=2024": first,
+                                                           "league=Serie_A/season=2024": first}
+    assert latest_payloads(loaded, as_of="2025-01-01") == {}
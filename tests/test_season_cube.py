@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from utils.players import build_player_index
+from utils.season_cube import build_season_cube, aggregate_seasons, aggregate_selections
+
+STATS = ["time", "goals", "xG", "shots"]
+SEASONS = ["2019", "2020", "2021", "2022", "2023"]
+
+def season_rows(n=600, seed=11):
+    """Random player-season rows: gaps between seasons, mid-season moves (several rows per cell), NaNs."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "player_name": rng.choice([f"Player {i:02d}" for i in range(60)], n),
+        "team_title": rng.choice(["Arsenal", "Roma", "Lyon", "Mainz"], n),
+        "league": rng.choice(["EPL", "Serie_A", "Ligue_1", "Bundesliga"], n),
+        "season": rng.choice(SEASONS, n),
+        "position": rng.choice(["F", "M", "D", "F M S"], n),
+        "time": rng.integers(0, 3000, n),
+        "goals": rng.integers(0, 15, n).astype("float64"),
+        "xG": rng.uniform(0, 12, n),
+        "shots": rng.integers(0, 80, n).astype("float64"),
+    })
+    df.loc[rng.choice(n, 40, replace=False), "goals"] = np.nan
+    df.loc[rng.choice(n, 40, replace=False), "xG"] = np.nan
+    df.loc[rng.choice(n, 20, replace=False), "time"] = 0
+    for col in ["goals", "xG", "shots"]:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df[f"{col}_per90"] = df[col] / df["time"] * 90
+    return df
+
+def cube_of(df):
+    return build_season_cube(df, build_player_index(df))
+
+def reference_totals(df, seasons=None):
+    """Brute force: filter the rows, group by player, sum; per-90s from the totals; rest from the latest row."""
+    rows = df[df["season"].isin(seasons)] if seasons else df
+    totals = rows.groupby("player_name")[STATS].sum()
+    for col in ["goals", "xG", "shots"]:
+        totals[f"{col}_per90"] = totals[col] / totals["time"].where(totals["time"] > 0) * 90
+    # First row (frame order) of each player's most recent season among the filtered rows
+    latest = rows.loc[rows.groupby("player_name")["season"].transform("max") == rows["season"]]
+    template = latest.groupby("player_name").head(1).set_index("player_name")
+    return totals, template
+
+def test_cube_matches_groupby_sum():
+    df = season_rows()
+    cube = cube_of(df)
+    expected = df.groupby(["player_name", "season"])[cube["stats"]].sum()
+
+    assert cube["seasons"] == SEASONS
+    for (player, season), row in expected.iterrows():
+        cell = cube["values"][cube["player_ids"][player], cube["seasons"].index(season)]
+        np.testing.assert_allclose(cell, row.to_numpy(dtype=float))
+
+    # Cells nobody played are zero and have no template row
+    played = np.zeros(cube["template"].shape, dtype=bool)
+    for player, season in expected.index:
+        played[cube["player_ids"][player], cube["seasons"].index(season)] = True
+    assert (cube["template"][~played] == -1).all()
+    assert (cube["values"][~played] == 0).all()
+
+def test_cube_template_is_first_row_of_cell():
+    df = season_rows()
+    cube = cube_of(df)
+    first = df.reset_index().groupby(["player_name", "season"])["index"].first()
+    for (player, season), position in first.items():
+        assert cube["template"][cube["player_ids"][player], cube["seasons"].index(season)] == position
+
+@pytest.mark.parametrize("seasons", [None, ["2023"], ["2020", "2022"], ["2019", "2020", "2021", "2022", "2023"]])
+def test_aggregate_seasons_matches_brute_force(seasons):
+    df = season_rows()
+    totals, template = reference_totals(df, seasons)
+
+    result = aggregate_seasons(cube_of(df), df, seasons=seasons).set_index("player_name").sort_index()
+
+    assert list(result.index) == list(totals.index)
+    pdt.assert_frame_equal(result[totals.columns], totals, check_dtype=False)
+    pdt.assert_frame_equal(result[["team_title", "league", "position"]],
+                           template.loc[result.index, ["team_title", "league", "position"]])
+    assert (result["season"] == "All seasons").all()
+
+def test_aggregate_seasons_subset_of_players():
+    df = season_rows()
+    players = ["Player 03", "Player 41", "Nobody", "Player 17"]
+    totals, _ = reference_totals(df[df["player_name"].isin(players)], ["2021", "2022"])
+
+    result = aggregate_seasons(cube_of(df), df, players=players, seasons=["2021", "2022"])
+
+    # Requested order, for the players that exist and played those seasons
+    expected = [p for p in players if p in totals.index]
+    assert list(result["player_name"]) == expected
+    pdt.assert_frame_equal(result.set_index("player_name")[totals.columns], totals.loc[expected],
+                           check_dtype=False)
+
+def test_aggregate_selections_keeps_order_and_duplicates():
+    df = season_rows()
+    selections = [
+        ("Player 10", ["2022"]),
+        ("Player 05", []),
+        ("Nobody", []),
+        ("Player 10", ["2019", "2023"]),
+    ]
+    result = aggregate_selections(cube_of(df), df, selections).reset_index(drop=True)
+
+    kept = [(p, s) for p, s in selections if p != "Nobody"]
+    assert list(result["player_name"]) == [p for p, _ in kept]
+    for i, (player, seasons) in enumerate(kept):
+        totals, template = reference_totals(df[df["player_name"] == player], seasons)
+        pdt.assert_series_equal(result.loc[i, totals.columns], totals.loc[player], check_dtype=False,
+                                check_names=False)
+        assert result.loc[i, "team_title"] == template.loc[player, "team_title"]
+        assert result.loc[i, "season"] == (seasons[0] if len(seasons) == 1 else "All seasons")
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.players import build_player_index
+from utils.season_cube import build_season_cube
+from utils.percentiles import position_group
+from utils.similarity import build_similarity_index, nearest_neighbours, similar_players
+
+STATS = ["goals", "xG", "shots", "assists"]
+
+def season_rows(n=900, seed=4):
+    """Random player-season rows with mid-season moves (several rows per player-season) and zero-minute rows."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "player_name": rng.choice([f"Player {i:03d}" for i in range(150)], n),
+        "league": rng.choice(["EPL", "Serie_A", "La_liga"], n),
+        "season": rng.choice(["2020", "2021", "2022", "2023"], n),
+        "position": rng.choice(["F", "F S", "M", "M S", "D"], n),
+        "time": rng.integers(0, 3400, n),
+        "goals": rng.poisson(4, n).astype("float64"),
+        "xG": rng.gamma(2.0, 2.0, n),
+        "shots": rng.poisson(30, n).astype("float64"),
+        "assists": rng.poisson(3, n).astype("float64"),
+    })
+    df.loc[rng.choice(n, 30, replace=False), "time"] = 0
+    return df
+
+def index_of(df):
+    return build_similarity_index(df, build_season_cube(df, build_player_index(df)), stats=STATS)
+
+def reference_profiles(df, standardize_min_minutes):
+    """Brute force: player-season per-90s from a groupby, z-scored over the qualifying player-seasons."""
+    totals = df.groupby(["player_name", "season"])[["time"] + STATS].sum()
+    totals = totals[totals["time"] > 0]
+    per90 = totals[STATS].div(totals["time"], axis=0) * 90
+    pool = per90[totals["time"] >= standardize_min_minutes]
+    std = pool.std(ddof=0).replace(0, 1.0)
+    first = df.groupby(["player_name", "season"])[["league", "position"]].first()
+    return (per90 - pool.mean()) / std, totals["time"], first.loc[totals.index]
+
+@pytest.mark.parametrize("block_rows", [1, 7, 64, 10_000])
+@pytest.mark.parametrize("k", [1, 5, 40, 500])
+def test_nearest_neighbours_matches_full_distance_sort(k, block_rows):
+    rng = np.random.default_rng(k)
+    matrix = rng.normal(size=(300, 6))
+    queries = rng.normal(size=(4, 6))
+    candidates = rng.random(300) < 0.5
+
+    rows, distances = nearest_neighbours(matrix, np.einsum("ij,ij->i", matrix, matrix), queries, k,
+                                         candidates=candidates, block_rows=block_rows)
+
+    for q, query in enumerate(queries):
+        full = np.linalg.norm(matrix - query, axis=1)
+        full[~candidates] = np.inf
+        expected = np.argsort(full, kind="stable")[:k]
+        found = np.isfinite(distances[q])
+        assert found.sum() == min(k, candidates.sum())
+        np.testing.assert_array_equal(rows[q][found], expected[:found.sum()])
+        np.testing.assert_allclose(distances[q][found], full[expected[:found.sum()]], rtol=1e-6)
+
+def test_similarity_index_matches_groupby_profiles():
+    df = season_rows()
+    index = index_of(df)
+    profiles, minutes, first = reference_profiles(df, 900)
+
+    keys = pd.MultiIndex.from_arrays([index["players"], index["seasons"]])
+    assert sorted(keys) == sorted(profiles.index)
+    np.testing.assert_allclose(index["matrix"], profiles.loc[keys].to_numpy(), rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(index["minutes"], minutes.loc[keys].to_numpy())
+    assert list(index["leagues"]) == list(first.loc[keys, "league"])
+    assert list(index["position_groups"]) == [position_group(p) for p in first.loc[keys, "position"]]
+
+@pytest.mark.parametrize("guards", [
+    {},
+    {"min_minutes": 0},
+    {"same_position": True},
+    {"same_league": True, "min_minutes": 2000},
+    {"same_position": True, "same_league": True, "min_minutes": 3000},
+])
+def test_similar_players_matches_brute_force(guards):
+    df = season_rows()
+    index = index_of(df)
+    profiles, minutes, first = reference_profiles(df, 900)
+
+    player_row = df[df["time"] > 0].iloc[0].copy()
+    for s in STATS:
+        player_row[f"{s}_per90"] = player_row[s] / player_row["time"] * 90
+    query = (player_row[[f"{s}_per90" for s in STATS]].to_numpy(dtype=float) - index["mean"]) / index["std"]
+
+    # Brute force: every other player-season passing the guards, sorted by distance
+    keep = profiles.index.get_level_values("player_name") != player_row["player_name"]
+    keep &= minutes >= guards.get("min_minutes", 900)
+    if guards.get("same_position"):
+        keep &= first["position"].map(position_group) == position_group(player_row["position"])
+    if guards.get("same_league"):
+        keep &= first["league"] == player_row["league"]
+    distances = np.linalg.norm(profiles[keep].to_numpy() - query, axis=1)
+    expected = profiles[keep].index[np.argsort(distances, kind="stable")[:10]]
+
+    result = similar_players(index, player_row, k=10, **guards)
+
+    assert list(zip(result["player_name"], result["season"])) == list(expected)
+    np.testing.assert_allclose(result["distance"], np.sort(distances)[:10], rtol=1e-4)
+    assert (result["player_name"] != player_row["player_name"]).all()
+
+def test_similar_players_without_a_complete_profile():
+    df = season_rows()
+    player_row = df.iloc[0].copy()
+    player_row["goals_per90"] = np.nan
+    assert similar_players(index_of(df), player_row).empty
@@ -3,41 +3,47 @@ import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from constants import METRIC_LABELS
+from utils.percentiles import build_percentile_index
+from utils.profiling import profiled
+
+# One color per compared player, in slot order (Player 1 blue, Player 2 red, ...)
+PLAYER_COLORS = ["#1f77b4", "#d62728", "#2ca02c", "#ff7f0e", "#9467bd",
+                 "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf"]
+
+# Bar charts keep their brighter blue for Player 1
+BAR_COLORS = ["#0068c9"] + PLAYER_COLORS[1:]
+
+def _player_color(colors, i):
+    return colors[i % len(colors)]
+
+def _rgba(hex_color, alpha):
+    r, g, b = (int(hex_color[i:i + 2], 16) for i in (1, 3, 5))
+    return f"rgba({r},{g},{b},{alpha})"
 
 # --------------------------- COMPARISON PLOT FUNCTION ---------------------------
 
-def plot_comparison(player1_data, player2_data, label1, label2, stats, stat_type, title):
+@profiled
+def plot_comparison(players, stats, stat_type, title):
     """
-    Create a horizontal bar chart comparing one or two players for the given list of stats.
+    Create a horizontal bar chart comparing any number of players for the given list of stats.
+    - players: one row per player with a "label" column (see utils.players.gather_players)
     - stats: list of column names to compare
     - title: section title (e.g. "Finishing", "Creativity")
     """
 
     # If absolutely no players, don't plot
-    if player1_data is None and player2_data is None:
+    if players is None or len(players) == 0:
         return None
 
-    rows = []
+    labels_list = players["label"].tolist()
+    values = players[stats].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
 
-    # Add Player 1 rows if available 
-    if player1_data is not None:
-        for stat in stats:
-            rows.append({
-                "stat": stat,
-                "series": label1,
-                "value": player1_data[stat],
-            })
-
-    # Add Player 2 rows if available
-    if player2_data is not None:
-        for stat in stats:
-            rows.append({
-                "stat": stat,
-                "series": label2,
-                "value": player2_data[stat],
-            })
-
-    plot_df = pd.DataFrame(rows)
+    # Long format in one step: player-major, stats in the given order
+    plot_df = pd.DataFrame({
+        "stat": np.tile(stats, len(players)),
+        "series": np.repeat(labels_list, len(stats)),
+        "value": values.ravel(),
+    })
 
     # Round numeric values for cleaner display
     plot_df["value"] = plot_df["value"].round(2)
@@ -62,13 +68,11 @@ def plot_comparison(player1_data, player2_data, label1, label2, stats, stat_type
         labels=labels,
         height=max(350, 80 * len(stats)),
         title=None,
-        color_discrete_map={
-            label1: "#0068c9",  # blue
-            label2: "#d62728",  # red
-        },
+        color_discrete_map={label: _player_color(BAR_COLORS, i) for i, label in enumerate(labels_list)},
     )
 
-    base_height = max(420, 55 * len(stats))
+    # 55px per stat for two players, bars get their room as players are added
+    base_height = max(420, len(stats) * (35 + 10 * len(players)))
     fig.update_layout(
         autosize=True,
         height=base_height,
@@ -100,69 +104,75 @@ def plot_comparison(player1_data, player2_data, label1, label2, stats, stat_type
 
 # --------------------------- RADAR PLOT FUNCTION ---------------------------
 
-def player_r_values(player_row, stats, df_stats):
-    vals = []
-    for s in stats:
-        v = player_row.get(s, np.nan)
-
-        if pd.isna(v):
-            vals.append(np.nan)
-            continue
-
-        col = df_stats[s].dropna().values
-        if len(col) == 0:
-            vals.append(np.nan)
-        else:
-            vals.append(float((col <= v).mean() * 100))
-
-    return vals
-
-
-def plot_radar(df, player1_data, player2_data, label1, label2, stats, title):
-    if (player1_data is None) and (player2_data is None):
+def percentile_matrix(values, stats, percentile_indexes):
+    """
+    Percentiles (0-100) of a players x stats value matrix; row i is ranked against
+    percentile_indexes[i]. Players sharing an index are looked up in one searchsorted per stat.
+    """
+    r = np.full(values.shape, np.nan)
+    groups = {}
+    for i, index in enumerate(percentile_indexes):
+        groups.setdefault(id(index), (index, []))[1].append(i)
+
+    for index, rows in groups.values():
+        for k, s in enumerate(stats):
+            sorted_values = index.get(s)
+            if sorted_values is None or len(sorted_values) == 0:
+                continue
+            v = values[rows, k]
+            pct = np.searchsorted(sorted_values, v, side="right") / len(sorted_values) * 100
+            r[rows, k] = np.where(np.isnan(v), np.nan, pct)
+    return r
+
+
+@profiled
+def plot_radar(df, players, stats, title, percentile_indexes=None):
+    """
+    Radar chart of per-stat percentiles for any number of players.
+    - players: one row per player with a "label" column (see utils.players.gather_players)
+    - percentile_indexes: prebuilt index (see utils.percentiles) per player, so each player
+      can be placed in their own cohort; built from df[stats] where missing
+    """
+    if players is None or len(players) == 0:
         return None
     if len(stats) < 3:
         return None
 
     categories = [METRIC_LABELS.get(s, s) for s in stats]
 
-    df_stats = df[stats]
+    if percentile_indexes is None:
+        percentile_indexes = [None] * len(players)
+    fallback = None
+    indexes = []
+    for index in percentile_indexes:
+        if index is None or any(s not in index for s in stats):
+            if fallback is None:
+                fallback = build_percentile_index(df, stats)
+            index = fallback
+        indexes.append(index)
+
+    values = np.column_stack([
+        pd.to_numeric(players[s], errors="coerce").to_numpy(dtype="float64") if s in players.columns
+        else np.full(len(players), np.nan)
+        for s in stats
+    ])
+    r = percentile_matrix(values, stats, indexes)
 
     fig = go.Figure()
 
-    if player1_data is not None:
-        r1 = player_r_values(player1_data, stats, df_stats)
-        val1 = [player1_data.get(s, np.nan) for s in stats]
-        fig.add_trace(
-            go.Scatterpolar(
-                r=r1 + [r1[0]], 
-                theta=categories + [categories[0]], 
-                name=label1, 
-                line=dict(color="#1f77b4"),
-                fill="toself",
-                fillcolor="rgba(31,119,180,0.35)",
-                customdata=(val1 + [val1[0]]),
-                hovertemplate=(
-                    "<b>%{fullData.name}</b><br>"
-                    "%{theta}<br>"
-                    "Value: %{customdata:.2f}<br>"
-                    "Percentile: %{r:.1f}<extra></extra>"
-                ),
-            )
-        )
-
-    if player2_data is not None:
-        r2 = player_r_values(player2_data, stats, df_stats)
-        val2 = [player2_data.get(s, np.nan) for s in stats]
+    for i, label in enumerate(players["label"]):
+        color = _player_color(PLAYER_COLORS, i)
+        r_i = r[i].tolist()
+        val_i = values[i].tolist()
         fig.add_trace(
             go.Scatterpolar(
-                r=r2 + [r2[0]], 
+                r=r_i + [r_i[0]], 
                 theta=categories + [categories[0]], 
-                name=label2, 
-                line=dict(color="#d62728"),
+                name=label, 
+                line=dict(color=color),
                 fill="toself",
-                fillcolor="rgba(214,39,40,0.35)",
-                customdata=(val2 + [val2[0]]),
+                fillcolor=_rgba(color, 0.35),
+                customdata=(val_i + [val_i[0]]),
                 hovertemplate=(
                     "<b>%{fullData.name}</b><br>"
                     "%{theta}<br>"
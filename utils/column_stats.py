@@ -0,0 +1,135 @@
+from pathlib import Path
+import json
+import os
+import numpy as np
+import pyarrow.parquet as pq
+from utils.manifest import live_part_files
+
+# Per-partition sidecar next to the part files (underscore: not read as data)
+STATS_FILE = "_column_stats.json"
+
+# Quantiles kept per column
+QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+# Quantiles bounding a column's typical range (Find Players hints and default max bounds)
+TYPICAL_RANGE = (0.05, 0.95)
+
+# --------------------------- COMPUTE ---------------------------
+
+def compute_column_stats(df):
+    """
+    {column: {count, nulls, min, max, quantiles}} for the numeric columns of one partition.
+    quantiles maps str(q) -> value (None if the column is all null).
+    """
+    stats = {}
+    for col in df.select_dtypes(include="number").columns:
+        values = df[col].to_numpy(dtype="float64", na_value=np.nan)
+        present = values[~np.isnan(values)]
+        quantiles = np.quantile(present, QUANTILES) if len(present) else [None] * len(QUANTILES)
+        stats[col] = {
+            "count": int(len(values)),
+            "nulls": int(len(values) - len(present)),
+            "min": float(present.min()) if len(present) else None,
+            "max": float(present.max()) if len(present) else None,
+            "quantiles": {str(q): (None if v is None else float(v)) for q, v in zip(QUANTILES, quantiles)},
+        }
+    return stats
+
+def merge_column_stats(stats_list):
+    """
+    Combine column stats of several parts/partitions: count, nulls, min and max are exact,
+    quantiles are the count-weighted mean of the parts' quantiles (an approximation).
+    """
+    merged = {}
+    for stats in stats_list:
+        for col, s in stats.items():
+            m = merged.setdefault(col, {"count": 0, "nulls": 0, "min": None, "max": None, "_q": {}})
+            m["count"] += s["count"]
+            m["nulls"] += s["nulls"]
+            if s["min"] is not None:
+                m["min"] = s["min"] if m["min"] is None else min(m["min"], s["min"])
+            if s["max"] is not None:
+                m["max"] = s["max"] if m["max"] is None else max(m["max"], s["max"])
+            weight = s["count"] - s["nulls"]
+            for q, v in (s.get("quantiles") or {}).items():
+                if v is not None and weight > 0:
+                    total, w = m["_q"].get(q, (0.0, 0))
+                    m["_q"][q] = (total + v * weight, w + weight)
+
+    for m in merged.values():
+        m["quantiles"] = {q: total / w for q, (total, w) in m.pop("_q").items()} or None
+    return merged
+
+# --------------------------- READ / WRITE ---------------------------
+
+def write_column_stats(partition_dir, stats):
+    """Write a partition's sidecar atomically (hidden temp file, then rename)."""
+    path = Path(partition_dir) / STATS_FILE
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(stats, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def read_column_stats(partition_dir):
+    path = Path(partition_dir) / STATS_FILE
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def footer_column_stats(partition_dir):
+    """
+    Fallback for partitions without a sidecar: count, nulls, min and max from the
+    Parquet footers (row group statistics), no data pages read. No quantiles.
+    """
+    stats = []
+    for file in live_part_files(partition_dir):
+        metadata = pq.ParquetFile(file).metadata
+        for r in range(metadata.num_row_groups):
+            row_group = metadata.row_group(r)
+            part = {}
+            for c in range(row_group.num_columns):
+                column = row_group.column(c)
+                s = column.statistics
+                if column.physical_type not in ("INT32", "INT64", "FLOAT", "DOUBLE") or s is None:
+                    continue
+                part[column.path_in_schema] = {
+                    "count": row_group.num_rows,
+                    "nulls": s.null_count if s.has_null_count else 0,
+                    "min": float(s.min) if s.has_min_max else None,
+                    "max": float(s.max) if s.has_min_max else None,
+                    "quantiles": None,
+                }
+            stats.append(part)
+    return merge_column_stats(stats)
+
+def load_column_stats(base_path):
+    """{partition key: column stats} for every league=*/season=* partition under base_path."""
+    stats = {}
+    for partition_dir in sorted(Path(base_path).glob("league=*/season=*")):
+        key = f"{partition_dir.parent.name}/{partition_dir.name}"
+        stats[key] = read_column_stats(partition_dir) or footer_column_stats(partition_dir)
+    return stats
+
+# --------------------------- WIDGET BOUNDS ---------------------------
+
+def column_bounds(stats, col, default=(0, 0)):
+    """(min, max) of col over all partitions."""
+    s = stats.get(col)
+    if s is None or s["min"] is None:
+        return default
+    return s["min"], s["max"]
+
+def column_quantile(stats, col, q, default=None):
+    """Approximate q-quantile of col over all partitions (None without sidecar quantiles)."""
+    s = stats.get(col)
+    if s is None or not s.get("quantiles"):
+        return default
+    return s["quantiles"].get(str(q), default)
+
+def typical_range(stats, col, quantiles=TYPICAL_RANGE):
+    """(low, high) approximate quantiles of col over all partitions, None without sidecar quantiles."""
+    low, high = (column_quantile(stats, col, q) for q in quantiles)
+    if low is None or high is None:
+        return None
+    return low, high
@@ -1,21 +1,169 @@
+import hashlib
+from pathlib import Path
 import streamlit as st
+from streamlit import runtime
 import pandas as pd
-import glob
+import pyarrow as pa
+import pyarrow.dataset as ds
+from constants import LEAGUE_NAME_MAP, DATA_VERSION_CACHE_ENTRIES
+from utils.format import clean_html_entities
+from utils.column_stats import STATS_FILE, load_column_stats, merge_column_stats
+from utils.manifest import MANIFEST_FILE, dataset_files
+from utils.memory import COMPACT_MEMORY, compact_frame, relabel
+from utils.players import enrich_player_metrics
+from utils.season import SEASON_NAME_MAP
+from utils.profiling import profiled
 
-@st.cache_resource
-def load_understat_data(base_path):
-    # Find all parquet files recursively (each partition = league/season)
-    paths = glob.glob(f"{base_path}/league=*/season=*/*.parquet")
-    if not paths:
+def enable_copy_on_write():
+    """
+    Turn on pandas copy-on-write (process-wide). The prepared frames are shared by every
+    session: with copy-on-write, writing to a view handed to a page copies the touched
+    column instead of modifying the shared data.
+    """
+    if not pd.get_option("mode.copy_on_write"):
+        pd.set_option("mode.copy_on_write", True)
+
+# Every page imports this module before it touches any data, so inside the running app
+# copy-on-write is on from the first page script onwards. Scripts that import the loader
+# (no Streamlit runtime) keep pandas' default behaviour.
+if runtime.exists():
+    enable_copy_on_write()
+
+# Partition keys are kept as strings so "2014" never turns into an int32 season
+PARTITIONING = ds.partitioning(
+    pa.schema([("league", pa.string()), ("season", pa.string())]),
+    flavor="hive",
+)
+
+# Reads restarted when a part file disappears mid-read (replaced by a compaction/overwrite)
+READ_ATTEMPTS = 3
+
+def open_understat_dataset(base_path):
+    """
+    Open the league=*/season=* Parquet tree as a single Hive-partitioned dataset,
+    made of the part files each partition's manifest lists (see utils.manifest).
+    """
+    files = [f.as_posix() for f in dataset_files(base_path)]
+    if not files:
         raise FileNotFoundError(f"No data files found.")
-    
-    # Load and combine all league/season parquet files into a single DataFrame
-    dfs = []
-    for p in paths:
-        df = pd.read_parquet(p)      
-        df["league"] = df["league"].astype(str)
-        df["season"] = df["season"].astype(str)
-        dfs.append(df)
-
-    # Return and merge all data
-    return pd.concat(dfs, ignore_index=True)
\ No newline at end of file
+    return ds.dataset(files, format="parquet", partitioning=PARTITIONING,
+                      partition_base_dir=Path(base_path).as_posix())
+
+def _partition_filter(leagues=None, seasons=None):
+    """Build a dataset expression so that only matching partitions are read."""
+    expr = None
+    if leagues:
+        expr = ds.field("league").isin([str(l) for l in leagues])
+    if seasons:
+        season_expr = ds.field("season").isin([str(s) for s in seasons])
+        expr = season_expr if expr is None else expr & season_expr
+    return expr
+
+def get_data_version(base_path):
+    """
+    Fingerprint of the partition files (path, size, mtime): the manifest of partitions
+    that have one (every write swaps it), all part files of those that do not, and the
+    column statistics sidecar (also backfilled on its own by scripts/write_column_stats.py).
+    Changes whenever the fetcher rewrites a partition, so it can key cached derived data.
+    """
+    digest = hashlib.sha1()
+    for partition_dir in sorted(Path(base_path).glob("league=*/season=*")):
+        manifest = partition_dir / MANIFEST_FILE
+        files = [manifest] if manifest.exists() else sorted(partition_dir.glob("*.parquet"))
+        for p in files + [partition_dir / STATS_FILE]:
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue
+            digest.update(f"{p.as_posix()}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+@st.cache_resource(max_entries=DATA_VERSION_CACHE_ENTRIES)
+def get_column_stats(base_path, data_version):
+    """
+    Column statistics of the whole tree (partition sidecars merged), read once per
+    data version: widget bounds without scanning the data.
+    """
+    return merge_column_stats(load_column_stats(base_path).values())
+
+@profiled
+def _read_understat_data(base_path, leagues=None, seasons=None, columns=None):
+    for attempt in range(READ_ATTEMPTS):
+        try:
+            dataset = open_understat_dataset(base_path)
+            table = dataset.to_table(
+                columns=list(columns) if columns else None,
+                filter=_partition_filter(leagues, seasons),
+                use_threads=True,
+            )
+            break
+        except FileNotFoundError:
+            # A part listed by the old manifest was removed after the swap: list again
+            if attempt == READ_ATTEMPTS - 1:
+                raise
+    df = table.to_pandas()
+
+    # Keep identifiers as plain strings, same as the per-file loader did
+    for c in ("league", "season"):
+        if c in df.columns:
+            df[c] = df[c].astype(str)
+
+    return df
+
+@st.cache_resource(max_entries=DATA_VERSION_CACHE_ENTRIES)
+def load_understat_data(base_path, leagues=None, seasons=None, columns=None, data_version=None):
+    """
+    Load the partitioned Understat data into a single DataFrame.
+    - leagues / seasons: optional lists, partitions outside them are never opened
+    - columns: optional list of columns to read (default: all)
+    - data_version: only part of the cache key, pass get_data_version() to pick up new data
+    Files are scanned with multi-threaded reads.
+    """
+    return _read_understat_data(base_path, leagues, seasons, columns)
+
+# --------------------------- PREPARED DATASET ---------------------------
+
+@st.cache_resource(max_entries=DATA_VERSION_CACHE_ENTRIES)
+@profiled
+def _prepare_data(base_path, data_version):
+    """
+    Raw data with HTML entities unescaped. Built once per data version.
+    With UNDERSTAT_COMPACT_MEMORY=1 it is kept in the compact layout (see utils.memory).
+    """
+    df = _read_understat_data(base_path)
+    df = clean_html_entities(df, ["player_name", "team_title"])
+    if COMPACT_MEMORY:
+        df = compact_frame(df)
+    return df
+
+@st.cache_resource(max_entries=DATA_VERSION_CACHE_ENTRIES)
+@profiled
+def _prepare_labelled_data(base_path, data_version):
+    """Display-ready data: league/season labels mapped and derived metrics added."""
+    df = _prepare_data(base_path, data_version)
+    df = df.assign(
+        league=relabel(df["league"], LEAGUE_NAME_MAP),
+        season=relabel(df["season"], SEASON_NAME_MAP),
+    )
+    df = enrich_player_metrics(df)
+    if COMPACT_MEMORY:
+        df = compact_frame(df)
+    return df
+
+def load_prepared_data(base_path, labelled=False, data_version=None):
+    """
+    Read-only view of the prepared dataset shared by all sessions.
+    - labelled=False: league/season codes as stored (comparison pages, leaderboard)
+    - labelled=True: friendly league/season names plus enriched metrics (Find Players)
+    - data_version: the version to load (default: get_data_version() now). Pages take the
+      version once and pass the same value here and to every get_*_index call, so derived
+      indexes are never cached under a newer version than the frame they were built from.
+    The heavy work runs once per data version; each call only makes a shallow view.
+    """
+    if data_version is None:
+        data_version = get_data_version(base_path)
+    if labelled:
+        df = _prepare_labelled_data(base_path, data_version)
+    else:
+        df = _prepare_data(base_path, data_version)
+    return df.copy(deep=False)
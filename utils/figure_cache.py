@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+import streamlit as st
+import plotly.io as pio
+from streamlit.logger import get_logger
+from utils.profiling import register_stats
+
+# Serialized figures kept across all sessions (least recently used dropped first)
+FIGURE_CACHE_ENTRIES = 256
+
+# The counters are written to the server log every this many lookups (profiler or not)
+FIGURE_CACHE_LOG_EVERY = 100
+
+logger = get_logger(__name__)
+
+# --------------------------- CACHE ---------------------------
+
+@st.cache_resource
+def get_figure_cache():
+    """Process-wide LRU of Plotly figures as JSON, shared by all sessions."""
+    return {
+        "entries": OrderedDict(),
+        "lock": threading.Lock(),
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+    }
+
+def figure_key(data_version, chart, selections, stats, stat_type=None, cohort=None):
+    """
+    Cache key of a comparison figure: everything the figure is built from.
+    selections: [(player, seasons)] as returned by utils.players.select_players.
+    """
+    return (
+        data_version,
+        chart,
+        tuple((player, tuple(seasons)) for player, seasons in selections),
+        tuple(stats),
+        stat_type,
+        cohort,
+    )
+
+def cached_figure(key, build, max_entries=FIGURE_CACHE_ENTRIES):
+    """
+    Figure for key: deserialized from the cache on a hit, built with build() on a miss.
+    Figures are stored as JSON, so a cached figure is never shared (or mutated) between
+    sessions. A build() returning None is not cached.
+    """
+    cache = get_figure_cache()
+    with cache["lock"]:
+        serialized = cache["entries"].get(key)
+        if serialized is not None:
+            cache["entries"].move_to_end(key)
+            cache["hits"] += 1
+        else:
+            cache["misses"] += 1
+        log_stats = (cache["hits"] + cache["misses"]) % FIGURE_CACHE_LOG_EVERY == 0
+
+    if log_stats:
+        logger.info("Figure cache: %s", figure_cache_stats())
+
+    if serialized is not None:
+        return pio.from_json(serialized)
+
+    fig = build()
+    if fig is None:
+        return None
+
+    serialized = fig.to_json()
+    with cache["lock"]:
+        cache["entries"][key] = serialized
+        cache["entries"].move_to_end(key)
+        while len(cache["entries"]) > max_entries:
+            cache["entries"].popitem(last=False)
+            cache["evictions"] += 1
+    return fig
+
+def figure_cache_stats():
+    """Hit/miss counters and size of the shared figure cache."""
+    cache = get_figure_cache()
+    with cache["lock"]:
+        lookups = cache["hits"] + cache["misses"]
+        return {
+            "hits": cache["hits"],
+            "misses": cache["misses"],
+            "hit_rate": round(cache["hits"] / lookups, 3) if lookups else None,
+            "entries": len(cache["entries"]),
+            "evictions": cache["evictions"],
+        }
+
+register_stats("Figure cache", figure_cache_stats)
@@ -1,10 +1,19 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
+from utils.profiling import profiled
+from utils.percentiles import position_group
+from constants import DATA_VERSION_CACHE_ENTRIES
 
 # --------------------------- FILTER ---------------------------
 
 def multiselect_filter(label, series, key, default=None, sort_reverse=False, default_all=False, format_func=None):
     options = sorted(series.dropna().unique(), reverse=sort_reverse)
+    return multiselect_options(label, options, key, default=default, default_all=default_all, format_func=format_func)
+
+def multiselect_options(label, options, key, default=None, default_all=False, format_func=None):
+    """multiselect_filter over a ready-made option list (no scan of a column)."""
+    options = list(options)
 
     store_key = f"__store__{key}"
 
@@ -33,27 +42,185 @@ def multiselect_filter(label, series, key, default=None, sort_reverse=False, def
     st.session_state[store_key] = value
     return value
 
-def number_input_persist(label, key, min_value, max_value, value, step=1):
+def number_input_persist(label, key, min_value, max_value, value, step=1, help=None):
     # initialize once
     
     store_key = f"__store__{key}"
     initial = st.session_state.get(store_key, value)
 
-    val = st.number_input(label, value=initial, min_value=min_value, max_value=max_value, step=step, key=key)
+    val = st.number_input(label, value=initial, min_value=min_value, max_value=max_value, step=step, key=key,
+                          help=help)
 
     # persist selection for next time you visit the page
     st.session_state[store_key] = val
     return val
 
-def apply_list_filter(df, column, selected):
-    if selected:
-        return df[df[column].isin(selected)]
-    return df
-
+@profiled
 def apply_stat_filters(df, filters):
-    for col, state_key in filters:
-        value = st.session_state.get(state_key, 0)
-        if value > 0 and col in df.columns:
-            df = df[df[col] >= value]
-    return df
+    """Keep rows meeting every minimum in session state (one fused mask, one copy)."""
+    ranges = [(col, st.session_state.get(state_key, 0), None) for col, state_key in filters]
+    mask = stat_mask(df, ranges)
+    return df if mask is None else df[mask]
+
+# --------------------------- FILTER INDEX ---------------------------
+
+# Columns of the cascading Find Players filters, in cascade order
+FILTER_COLUMNS = ["season", "league", "team_title", "position"]
+
+@profiled
+def build_filter_index(df, columns=FILTER_COLUMNS):
+    """
+    Integer codes per filter column, so list filters become mask operations:
+    - codes: int array, row -> position of its value in values (-1 for missing)
+    - values: sorted distinct values
+    - lookup: value -> code
+    """
+    index = {}
+    for col in columns:
+        column = df[col]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # sort by value (as the option lists do), not by category order
+            column = column.astype(object)
+        codes, uniques = pd.factorize(column, sort=True)
+        values = list(uniques)
+        index[col] = {
+            "codes": codes,
+            "values": values,
+            "lookup": {v: i for i, v in enumerate(values)},
+        }
+    index["rows"] = len(df)
+    return index
+
+@st.cache_resource(max_entries=DATA_VERSION_CACHE_ENTRIES)
+def get_filter_index(_df, data_version):
+    """Filter index of the labelled frame, built once per data version."""
+    return build_filter_index(_df)
+
+def selection_mask(filter_index, column, selected):
+    """Boolean row mask for column in selected (None = no filter): a lookup table gathered by code."""
+    if not selected:
+        return None
+    entry = filter_index[column]
+    table = np.zeros(len(entry["values"]) + 1, dtype=bool)  # last slot: missing (-1)
+    table[[entry["lookup"][v] for v in selected if v in entry["lookup"]]] = True
+    return table[entry["codes"]]
+
+def combine_masks(*masks):
+    """AND of the given masks, skipping None (None if there is nothing to combine)."""
+    combined = None
+    for mask in masks:
+        if mask is not None:
+            combined = mask if combined is None else combined & mask
+    return combined
+
+def available_options(filter_index, column, mask=None):
+    """Sorted values of column present in the rows selected by mask (all values if None)."""
+    entry = filter_index[column]
+    if mask is None:
+        return list(entry["values"])
+    codes = entry["codes"][mask]
+    present = np.bincount(codes[codes >= 0], minlength=len(entry["values"])) > 0
+    return [v for v, keep in zip(entry["values"], present) if keep]
+
+# --------------------------- STAT PREDICATES ---------------------------
+
+# Cohorts of the "top X%" predicate: label -> column the ranking is grouped by
+PERCENTILE_COHORTS = {
+    "All results": None,
+    "Same position": "position",
+    "Same league": "league",
+}
+
+def _values(df, col):
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+def range_columns(df, ranges):
+    """Columns of the (col, min, max) predicates that constrain something (see stat_mask)."""
+    return [col for col, _, _ in _active_ranges(df, ranges)]
+
+def _active_ranges(df, ranges):
+    """(col, lo, hi) predicates that constrain something; a minimum of 0 counts as no minimum."""
+    active = []
+    for col, lo, hi in ranges:
+        lo = lo if lo is not None and lo > 0 else None
+        if col in df.columns and (lo is not None or hi is not None):
+            active.append((col, lo, hi))
+    return active
+
+def _in_range(values, lo, hi):
+    keep = ~np.isnan(values)
+    if lo is not None:
+        keep &= values >= lo
+    if hi is not None:
+        keep &= values <= hi
+    return keep
+
+def sorted_column(df, col):
+    """
+    (row order, sorted values, values) of a column, NaNs last:
+    the lookup structure for range predicates.
+    """
+    values = _values(df, col)
+    order = np.argsort(values, kind="stable")
+    return order, values[order], values
+
+def _range_slice(sorted_entry, lo, hi):
+    """Row positions with lo <= value <= hi, by binary search on the sorted column."""
+    order, sorted_values, _ = sorted_entry
+    start = 0 if lo is None else np.searchsorted(sorted_values, lo, side="left")
+    # NaNs sort last and must never match
+    stop = np.searchsorted(sorted_values, np.inf if hi is None else hi, side="right")
+    return order[start:stop]
+
+def stat_mask(df, ranges, top_pct=None, sorted_index=None):
+    """
+    Boolean row mask of df for all stat predicates at once (None when nothing constrains).
+    - ranges: [(col, min, max)] inclusive bounds, None = open (min 0 = open as well)
+    - top_pct: optional (col, pct, cohort_col): rows in the top pct% of col within their
+      cohort (cohort_col None = all rows), ranked over df before the other predicates
+    - sorted_index: optional {col: sorted_column(df, col)} (missing columns are added). With it the
+      tightest range is answered by binary search and the other predicates are only checked
+      on its rows, so tighter filters cost less
+    """
+    ranges = _active_ranges(df, ranges)
+    mask = None
+
+    if ranges and sorted_index is not None:
+        for col, _, _ in ranges:
+            if col not in sorted_index:
+                sorted_index[col] = sorted_column(df, col)
+        slices = [_range_slice(sorted_index[col], lo, hi) for col, lo, hi in ranges]
+        tightest = int(np.argmin([len(rows) for rows in slices]))
+        rows = slices[tightest]
+        keep = np.ones(len(rows), dtype=bool)
+        for i, (col, lo, hi) in enumerate(ranges):
+            if i != tightest:
+                keep &= _in_range(sorted_index[col][2][rows], lo, hi)
+        mask = np.zeros(len(df), dtype=bool)
+        mask[rows[keep]] = True
+    elif ranges:
+        mask = np.ones(len(df), dtype=bool)
+        for col, lo, hi in ranges:
+            mask &= _in_range(_values(df, col), lo, hi)
+
+    if top_pct is not None:
+        col, pct, cohort_col = top_pct
+        if col in df.columns and pct is not None and pct < 100:
+            values = pd.Series(_values(df, col), index=df.index)
+            if cohort_col is None:
+                ranks = values.rank(ascending=False, pct=True, method="max")
+            else:
+                ranks = values.groupby(_cohort_keys(df[cohort_col], cohort_col), observed=True).rank(
+                    ascending=False, pct=True, method="max")
+            in_top = (ranks <= pct / 100).to_numpy()
+            mask = in_top if mask is None else mask & in_top
+
+    return mask
+
+def _cohort_keys(series, cohort_col):
+    """Cohort of each row; positions are grouped without the substitute flag."""
+    if cohort_col != "position":
+        return series
+    uniques = series.dropna().unique()
+    return series.map(dict(zip(uniques, (position_group(u) for u in uniques))))
 
@@ -1,10 +1,18 @@
 import html
 import numpy as np
+import pandas as pd
+from utils.profiling import profiled
 
+@profiled
 def clean_html_entities(df, columns):
+    """Return a copy of df with HTML entities unescaped in the given columns (df is left untouched)."""
+    df = df.copy(deep=False)
     for col in columns:
         if col in df.columns:
-            df[col] = df[col].astype(str).apply(html.unescape)
+            values = df[col].astype(str)
+            # unescape each distinct value once, names repeat across seasons
+            uniques = values.unique()
+            df[col] = values.map(dict(zip(uniques, map(html.unescape, uniques))))
     return df
 
 def to_float(x):
@@ -45,3 +53,25 @@ def format_value(value):
     except (ValueError, TypeError):
         # Non-numeric: keep original (e.g. names, clubs)
         return str(value)
+
+def format_series(series):
+    """
+    Column-wise format_value: numeric columns are formatted in one vectorized pass,
+    other columns format each distinct value once.
+    """
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        nan = np.isnan(values)
+        filled = np.where(nan, 0.0, values)
+        integer = np.isfinite(filled) & (filled == np.round(filled))
+        formatted = np.where(
+            integer,
+            np.char.mod("%d", np.where(integer, filled, 0)),
+            np.char.mod("%.2f", filled),
+        )
+        return pd.Series(formatted, index=series.index, dtype=object)
+
+    uniques = series.dropna().unique()
+    mapping = dict(zip(uniques, map(format_value, uniques)))
+    return series.map(mapping).where(series.notna(), format_value(None))
+
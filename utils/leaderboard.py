@@ -1,22 +1,26 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from constants import METRIC_LABELS
+from constants import METRIC_LABELS, LEAGUE_NAME_MAP
 from utils.players import enrich_player_metrics
-from utils.format import format_value
+from utils.format import format_series
+from utils.percentiles import position_group
+from utils.profiling import profiled
 
-@st.cache_data
+# Bounds of the shared leaderboard table cache: (data version, season) entries and seconds
+LEADERBOARD_CACHE_ENTRIES = 16
+LEADERBOARD_CACHE_TTL = 24 * 60 * 60
+
+@profiled
 def build_player_table(df, season=None):
     """
     Vectorized version of build_player_table.
     - For a specific season: pick one row per player and enrich.
     - For 'All seasons': aggregate stats per player and recompute per90s.
     Expects a vectorized enrich function: enrich_player_metrics_df(df).
+    df is only read (no copy needed): every step below builds new frames.
     """
 
-    df = df.copy()
-    df["season"] = df["season"].astype(str)
-
     per90_suffix = "_per90"
 
     # ---------- 1) SPECIFIC SEASON (NO AGGREGATION) ----------
@@ -30,7 +34,7 @@ def build_player_table(df, season=None):
 
         # one row per player: most recent season row
         latest_per_player = season_df.loc[
-            season_df.groupby("player_name")["season"].idxmax()
+            season_df.groupby("player_name", observed=True)["season"].idxmax()
         ]
 
         # vectorized enrichment on the full DataFrame
@@ -46,10 +50,10 @@ def build_player_table(df, season=None):
     raw_cols = [c for c in num_cols if not c.endswith(per90_suffix)]
 
     # summed raw stats per player
-    summed = df.groupby("player_name")[raw_cols].sum(min_count=1)
+    summed = df.groupby("player_name", observed=True)[raw_cols].sum(min_count=1)
 
     # template row per player (for non-aggregated fields: team, league, etc.)
-    templates = df.loc[df.groupby("player_name")["season"].idxmax()]
+    templates = df.loc[df.groupby("player_name", observed=True)["season"].idxmax()]
     templates = templates.set_index("player_name")
 
     # keep only columns we are NOT overriding with sums
@@ -61,28 +65,128 @@ def build_player_table(df, season=None):
     players_df = enrich_player_metrics(merged.reset_index())
     return players_df
 
+@st.cache_resource(max_entries=LEADERBOARD_CACHE_ENTRIES, ttl=LEADERBOARD_CACHE_TTL)
+def get_player_table(_df, data_version, season=None):
+    """
+    build_player_table shared by all sessions, keyed by (data version, season)
+    instead of by hashing the whole frame on every call. Treat the result as read-only.
+    """
+    return build_player_table(_df, season)
 
-def display_leaderboard(df, stat_cols, season_string, n=10):
-    """Display a leaderboard of players for one or more statistics."""
 
-    leaderboard = (
-        df[["player_name"] + stat_cols]
-        .sort_values(
-            by=stat_cols,
-            ascending=[False] * len(stat_cols)
-        )
-        .head(n)
-        .reset_index(drop=True)
-    )
+# --------------------------- TOP-K ENGINE ---------------------------
+
+def _sort_keys(df, stat_cols, ascending=False):
+    """
+    One float key per stat where smaller sorts first (descending stats are negated)
+    and NaN is +inf, so missing values always come last.
+    """
+    if isinstance(ascending, bool):
+        ascending = [ascending] * len(stat_cols)
+    keys = []
+    for col, asc in zip(stat_cols, ascending):
+        values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        key = values if asc else -values
+        keys.append(np.where(np.isnan(key), np.inf, key))
+    return keys
+
+def _eligible_positions(df, min_minutes=0, minutes_col="time"):
+    """Row positions of players with at least min_minutes played."""
+    if min_minutes and minutes_col in df.columns:
+        minutes = pd.to_numeric(df[minutes_col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        return np.flatnonzero(minutes >= min_minutes)
+    return np.arange(len(df))
+
+def top_k(df, stat_cols, n=10, min_minutes=0, minutes_col="time", ascending=False):
+    """
+    Row positions of the n best rows by stat_cols (first stat decides, the next ones break ties).
+    - partial selection (np.partition) on the first stat keeps the candidates that can make
+      the top n, ties on the n-th value included, then only those are sorted lexicographically
+    - NaNs rank last, players under min_minutes are left out
+    - equal rows keep their order in df (the sort is stable)
+    """
+    keys = _sort_keys(df, stat_cols, ascending)
+    pos = _eligible_positions(df, min_minutes, minutes_col)
+
+    primary = keys[0][pos]
+    if len(pos) > n > 0:
+        kth = np.partition(primary, n - 1)[n - 1]
+        pos = pos[primary <= kth]
+
+    # np.lexsort sorts by the last key first
+    order = np.lexsort([k[pos] for k in reversed(keys)])
+    return pos[order][:n]
+
+def top_k_by_group(df, stat_cols, groups, n=10, min_minutes=0, minutes_col="time", ascending=False):
+    """
+    top_k for every group at once (e.g. per league or per position): one lexicographic
+    sort with the group as most significant key, then the first n rows of each group.
+    - groups: Series aligned with df holding each row's group (NaN = no group)
+    Returns {group: row positions}, groups in sorted order.
+    """
+    keys = _sort_keys(df, stat_cols, ascending)
+    pos = _eligible_positions(df, min_minutes, minutes_col)
+
+    codes, labels = pd.factorize(groups.iloc[pos], sort=True)
+    pos, codes = pos[codes >= 0], codes[codes >= 0]
+
+    order = np.lexsort([k[pos] for k in reversed(keys)] + [codes])
+    sorted_codes = codes[order]
+
+    # rank of each row inside its group
+    starts = np.searchsorted(sorted_codes, np.arange(len(labels)))
+    rank = np.arange(len(order)) - starts[sorted_codes]
+    keep = rank < n
+
+    top, top_codes = pos[order[keep]], sorted_codes[keep]
+    bounds = np.searchsorted(top_codes, np.arange(1, len(labels)))
+    return dict(zip(labels, np.split(top, bounds)))
+
+# --------------------------- DISPLAY ---------------------------
+
+# Leaderboard splits: label -> function giving each row's group
+SPLITS = {
+    "League": lambda df: _map_unique(df["league"], lambda l: LEAGUE_NAME_MAP.get(l, l)),
+    "Position": lambda df: _map_unique(df["position"], position_group),
+}
+
+def _map_unique(series, fn):
+    """series.map(fn), calling fn once per distinct value."""
+    uniques = series.dropna().unique()
+    return series.map(dict(zip(uniques, map(fn, map(str, uniques)))))
+
+def _leaderboard_table(df, positions, stat_cols):
+    """Formatted leaderboard rows, one vectorized format pass per column."""
+    table = df.iloc[positions][["player_name"] + stat_cols].reset_index(drop=True)
 
     rename_map = {"player_name": METRIC_LABELS.get("player_name", "Player")}
     rename_map.update({col: METRIC_LABELS.get(col, col) for col in stat_cols})
 
-    leaderboard = leaderboard.rename(columns=rename_map)
+    return pd.DataFrame({rename_map[col]: format_series(table[col]) for col in table.columns})
 
-    first_stat_pretty = rename_map[stat_cols[0]]
+@profiled
+def display_leaderboard(df, stat_cols, season_string, n=10, min_minutes=0, split_by=None):
+    """
+    Display a leaderboard of players for one or more statistics.
+    - min_minutes: leave out players with fewer minutes
+    - split_by: key of SPLITS, one tab per league/position (all computed in one pass)
+    """
+    first_stat_pretty = METRIC_LABELS.get(stat_cols[0], stat_cols[0])
     st.markdown(f"Top {n} players by {first_stat_pretty} ({season_string})")
 
-    leaderboard = leaderboard.map(format_value)
-
-    st.dataframe(leaderboard, width="stretch", hide_index=True)
\ No newline at end of file
+    if df.empty or any(col not in df.columns for col in stat_cols):
+        st.info(f"No data for {season_string} yet.")
+        return
+
+    if split_by is None:
+        positions = top_k(df, stat_cols, n=n, min_minutes=min_minutes)
+        st.dataframe(_leaderboard_table(df, positions, stat_cols), width="stretch", hide_index=True)
+        return
+
+    groups = top_k_by_group(df, stat_cols, SPLITS[split_by](df), n=n, min_minutes=min_minutes)
+    if not groups:
+        st.info(f"No players with {min_minutes}+ minutes ({season_string}).")
+        return
+    for tab, (group, positions) in zip(st.tabs([str(g) for g in groups]), groups.items()):
+        with tab:
+            st.dataframe(_leaderboard_table(df, positions, stat_cols), width="stretch", hide_index=True)
@@ -0,0 +1,42 @@
+from pathlib import Path
+import json
+import os
+
+# Per-partition list of the part files that make up its data (underscore: not read as data)
+MANIFEST_FILE = "_manifest.json"
+
+def read_manifest(partition_dir):
+    """Names of the partition's live part files, or None if it has no manifest."""
+    path = Path(partition_dir) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)["files"]
+
+def write_manifest(partition_dir, names):
+    """
+    Replace the partition's file list atomically (hidden temp file, then rename):
+    readers resolve either the old list or the new one, never a mix.
+    """
+    path = Path(partition_dir) / MANIFEST_FILE
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"files": sorted(names)}, f, indent=2)
+    os.replace(tmp, path)
+
+def live_part_files(partition_dir):
+    """
+    Part files of a partition: those listed in its manifest, or every *.parquet file
+    for a partition written before manifests existed. Files on disk but not listed
+    (being written, or replaced and about to be removed) are not part of the data.
+    """
+    partition_dir = Path(partition_dir)
+    names = read_manifest(partition_dir)
+    if names is None:
+        return sorted(partition_dir.glob("*.parquet"))
+    return [partition_dir / name for name in names]
+
+def dataset_files(base_path):
+    """Live part files of every league=*/season=* partition under base_path."""
+    return [f for partition_dir in sorted(Path(base_path).glob("league=*/season=*"))
+            for f in live_part_files(partition_dir)]
@@ -0,0 +1,79 @@
+import os
+import numpy as np
+import pandas as pd
+from utils.profiling import profiled
+
+# Opt-in: set UNDERSTAT_COMPACT_MEMORY=1 to keep the shared frame in the compact layout
+COMPACT_MEMORY = os.environ.get("UNDERSTAT_COMPACT_MEMORY", "") == "1"
+
+# Repeated string identifiers, stored as categoricals in compact mode
+IDENTIFIER_COLS = ["league", "season", "team_title", "position", "player_name"]
+
+# --------------------------- COMPACT LAYOUT ---------------------------
+
+def _smallest_int(series):
+    """
+    int16/int32 if the column's range fits (NaN-free integer columns only).
+    int8 is skipped: row-wise sums like goals + assists must not overflow.
+    """
+    lo, hi = series.min(), series.max()
+    for dtype in (np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return None
+
+@profiled
+def compact_frame(df, identifier_cols=IDENTIFIER_COLS):
+    """
+    Memory-lean copy of df:
+    - identifier columns -> categoricals (one copy of each distinct string)
+    - integer counting stats -> smallest integer type their range fits in
+    - float stats (xG, per-90s, ...) -> float32
+    """
+    df = df.copy()
+
+    for col in identifier_cols:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            # ordered, so max()/idxmax() on season keep working
+            categories = sorted(df[col].dropna().unique())
+            df[col] = df[col].astype(pd.CategoricalDtype(categories, ordered=True))
+
+    for col in df.select_dtypes(include="integer").columns:
+        dtype = _smallest_int(df[col]) if len(df) else None
+        if dtype is not None:
+            df[col] = df[col].astype(dtype)
+
+    for col in df.select_dtypes(include="float64").columns:
+        df[col] = df[col].astype("float32")
+
+    return df
+
+def relabel(series, mapping):
+    """Replace values through mapping; renames the categories of categorical columns."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.rename_categories(lambda c: mapping.get(c, c))
+    return series.replace(mapping)
+
+# --------------------------- MEMORY REPORT ---------------------------
+
+def memory_report(before, after):
+    """Bytes per column (deep) before/after, largest savings first, with a total row."""
+    report = pd.DataFrame({
+        "dtype_before": before.dtypes.astype(str),
+        "bytes_before": before.memory_usage(deep=True, index=False),
+        "dtype_after": after.dtypes.astype(str).reindex(before.columns),
+        "bytes_after": after.memory_usage(deep=True, index=False).reindex(before.columns),
+    })
+    report["saved_pct"] = (1 - report["bytes_after"] / report["bytes_before"]) * 100
+    report = report.sort_values("bytes_before", ascending=False)
+
+    total = report[["bytes_before", "bytes_after"]].sum()
+    report.loc["TOTAL"] = {
+        "dtype_before": "",
+        "bytes_before": total["bytes_before"],
+        "dtype_after": "",
+        "bytes_after": total["bytes_after"],
+        "saved_pct": (1 - total["bytes_after"] / total["bytes_before"]) * 100,
+    }
+    return report
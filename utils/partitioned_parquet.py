@@ -1,36 +1,174 @@
 from pathlib import Path
-import shutil
+import hashlib
+import json
+import os
+import uuid
 import pyarrow as pa
 import pyarrow.parquet as pq
 from datetime import datetime
+from utils.column_stats import (compute_column_stats, merge_column_stats, read_column_stats,
+                                footer_column_stats, write_column_stats)
+from utils.manifest import live_part_files, write_manifest
 
 # Define the base directory where all Parquet files will be stored
 DATA_DIR = Path("data/understat_players")
 
+# Options shared by every Parquet write
+# Repeated identifiers are dictionary-encoded, numeric columns are stored plain
+WRITE_OPTIONS = dict(
+    compression="snappy",
+    use_dictionary=["player_name", "team_title", "position", "league", "season"],
+)
+
+# Rows per row group when compacting (a league-season is ~500-600 rows)
+ROW_GROUP_SIZE = 64_000
+
+# Content hash of the last payload written to each partition (underscore: not read as data)
+HASHES_PATH = DATA_DIR / "_partition_hashes.json"
+
+def partition_path(league, season):
+    return DATA_DIR / f"league={league}" / f"season={season}"
+
+def partition_key(league, season):
+    return f"league={league}/season={season}"
+
+def partition_exists(league, season):
+    """True if the (league, season) partition has at least one Parquet file."""
+    return bool(live_part_files(partition_path(league, season)))
+
+def payload_hash(records):
+    """Stable SHA-256 of a raw Understat payload (key order does not matter)."""
+    payload = json.dumps(records, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def load_partition_hashes(path=HASHES_PATH):
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_partition_hashes(hashes, path=HASHES_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(dict(sorted(hashes.items())), f, indent=2)
+
+def _new_part_name():
+    # Random suffix: a compaction never reuses the name of a part it replaces
+    return f"part-{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+
+def _write_atomic(table, target, **options):
+    """
+    Write to a hidden temp file next to target, then rename it into place.
+    os.replace is atomic, so readers see either the old file or the complete new one,
+    and dot-prefixed temp files are never picked up by the dataset loader.
+    """
+    target = Path(target)
+    tmp = target.with_name(f".{target.name}.tmp")
+    try:
+        pq.write_table(table, tmp, **{**WRITE_OPTIONS, **options})
+        os.replace(tmp, target)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+def _publish(path, files, replaced=()):
+    """
+    Make files the content of a partition with one atomic manifest rename, then remove
+    the replaced part files. Readers only open files listed in the manifest, so they see
+    all of the old parts or all of the new ones; one that listed the old parts just
+    before they were removed retries (see utils.data_loader).
+    """
+    write_manifest(path, [f.name for f in files])
+    for stale in replaced:
+        if stale not in files:
+            stale.unlink(missing_ok=True)
+
+def _swap_in(table, path, **options):
+    """Replace the content of a partition with table, written as one new part file."""
+    existing = live_part_files(path)
+    target = path / _new_part_name()
+    _write_atomic(table, target, **options)
+    _publish(path, [target], replaced=existing)
+    return target
+
 def write_partitioned_players(df, mode: str = "append"):
     """
     Write player data as partitioned Parquet files by (league, season).
-    
+    Each write adds a new part file and then swaps the partition's manifest, so a
+    running app never reads an empty, half-written or half-replaced partition.
+
     mode:
-      - 'append' (default): keep existing parts
-      - 'overwrite': delete each (league, season) partition before writing
+      - 'append' (default): keep existing parts, add a new one
+      - 'overwrite': swap the partition's content for the new rows
+
+    Each partition's column statistics sidecar is written first, so an app that sees
+    the new files (a new data version) never reads older statistics.
     """
-    for (league, season), part in df.groupby(["league", "season"]):
+    for (league, season), part in df.groupby(["league", "season"], observed=True):
         if part.empty:
             print(f"[INFO] Skipping empty partition: {league} {season}")
             continue
 
-        path = DATA_DIR / f"league={league}" / f"season={season}"
-
-        # If overwrite mode is selected, remove the existing folder before writing new files
-        if mode == "overwrite" and path.exists():
-            shutil.rmtree(path)
+        path = partition_path(league, season)
         path.mkdir(parents=True, exist_ok=True)
 
         # Convert the DataFrame into a PyArrow Table (efficient columnar format)
         table = pa.Table.from_pandas(part.reset_index(drop=True), preserve_index=False)
 
-        filename = f"part-{datetime.now():%Y%m%d-%H%M%S}.parquet"
-        pq.write_table(table, path / filename, compression="snappy", use_dictionary=False)
+        stats = compute_column_stats(part)
+        existing = live_part_files(path)
+        if mode != "overwrite" and existing:
+            previous = read_column_stats(path) or footer_column_stats(path)
+            stats = merge_column_stats([previous, stats])
+        write_column_stats(path, stats)
+
+        if mode == "overwrite":
+            target = _swap_in(table, path)
+        else:
+            target = path / _new_part_name()
+            _write_atomic(table, target)
+            _publish(path, existing + [target])
+
+        print(f"[OK] Wrote {len(part)} rows to {target} ({mode=})")
+
+# --------------------------- COMPACTION ---------------------------
+
+def compact_partition(path, sort_by=("player_name", "id"), row_group_size=ROW_GROUP_SIZE):
+    """
+    Merge all part files of one partition into a single file.
+    - rows sorted by sort_by (columns that are missing are ignored)
+    - row groups of at most row_group_size rows
+    Returns the number of part files that were merged.
+    """
+    parts = live_part_files(path)
+    if not parts:
+        return 0
+
+    tables = [pq.read_table(p) for p in parts]
+    table = pa.concat_tables(tables, promote_options="default")
+
+    keys = [(c, "ascending") for c in sort_by if c in table.column_names]
+    if keys:
+        table = table.sort_by(keys)
 
-        print(f"[OK] Wrote {len(part)} rows to {path / filename} ({mode=})")
\ No newline at end of file
+    # Exact statistics again (appends only merge them)
+    write_column_stats(path, compute_column_stats(table.to_pandas()))
+    _swap_in(table, path, row_group_size=row_group_size)
+    return len(parts)
+
+def compact_partitions(base_dir=DATA_DIR, min_files=2, sort_by=("player_name", "id"), row_group_size=ROW_GROUP_SIZE):
+    """
+    Compact every league=*/season=* partition with at least min_files part files
+    (min_files=1 rewrites every partition, e.g. to apply the sort order).
+    """
+    compacted = 0
+    for path in sorted(Path(base_dir).glob("league=*/season=*")):
+        n_parts = len(live_part_files(path))
+        if n_parts < min_files:
+            continue
+        compact_partition(path, sort_by=sort_by, row_group_size=row_group_size)
+        print(f"[OK] Compacted {n_parts} part(s) in {path}")
+        compacted += 1
+    return compacted
\ No newline at end of file
@@ -0,0 +1,108 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+from utils.profiling import profiled
+from constants import DATA_VERSION_CACHE_ENTRIES
+
+# --------------------------- COHORTS ---------------------------
+
+MIN_MINUTES_COHORT = 900
+
+# Cohort name -> (column the cohort is grouped by, minimum minutes played)
+COHORTS = {
+    "All players": (None, 0),
+    "Same position": ("position_group", 0),
+    "Same league": ("league", 0),
+    "Same season": ("season", 0),
+    f"{MIN_MINUTES_COHORT}+ minutes played": (None, MIN_MINUTES_COHORT),
+}
+
+DEFAULT_COHORT = "All players"
+
+def position_group(position):
+    """
+    Position code without the substitute flag ("F M S" -> "F M").
+    Players who only came off the bench stay in their own "S" group.
+    """
+    codes = [p for p in str(position).split() if p != "S"]
+    return " ".join(codes) if codes else "S"
+
+# --------------------------- PERCENTILE INDEX ---------------------------
+
+@profiled
+def build_percentile_index(df, stats):
+    """
+    Sorted non-null values of each stat.
+    A percentile is then a binary search instead of a full column scan.
+    """
+    return {
+        s: np.sort(pd.to_numeric(df[s], errors="coerce").dropna().to_numpy(dtype=float))
+        for s in stats
+        if s in df.columns
+    }
+
+def percentile_of(sorted_values, v):
+    """Share of values <= v (0-100), answered in O(log n)."""
+    if sorted_values is None or len(sorted_values) == 0 or pd.isna(v):
+        return np.nan
+    return float(np.searchsorted(sorted_values, v, side="right") / len(sorted_values) * 100)
+
+def _per90_cols(df):
+    return [c for c in df.columns if c.endswith("_per90")]
+
+# --------------------------- COHORT ENGINE ---------------------------
+
+@profiled
+def build_cohort_percentiles(df, stats, cohorts=None):
+    """
+    Percentile indexes for every group of every cohort:
+    {cohort name: {group value: {stat: sorted values}}}.
+    Ungrouped cohorts store a single index under the key None.
+    """
+    if cohorts is None:
+        cohorts = COHORTS
+
+    df = df.assign(position_group=df["position"].map(position_group))
+
+    result = {}
+    for name, (group_col, min_minutes) in cohorts.items():
+        pool = df[df["time"] >= min_minutes] if min_minutes else df
+
+        if group_col is None:
+            result[name] = {None: build_percentile_index(pool, stats)}
+        else:
+            result[name] = {
+                str(key): build_percentile_index(rows, stats)
+                for key, rows in pool.groupby(group_col, observed=True)
+            }
+    return result
+
+@st.cache_resource(max_entries=DATA_VERSION_CACHE_ENTRIES)
+def get_cohort_percentiles(_df, data_version):
+    """Cohort percentile indexes over every per-90 metric, built once per data version."""
+    return build_cohort_percentiles(_df, _per90_cols(_df))
+
+def cohort_group_key(player_row, cohort, cohorts=None):
+    """Group of the cohort the player belongs to (None for ungrouped cohorts)."""
+    if cohorts is None:
+        cohorts = COHORTS
+
+    group_col = cohorts[cohort][0]
+    if group_col is None:
+        return None
+    if group_col == "position_group":
+        return position_group(player_row.get("position", ""))
+    return str(player_row.get(group_col, ""))
+
+def cohort_percentile_index(cohort_percentiles, cohort, player_row, cohorts=None):
+    """
+    Percentile index a player is ranked against for the given cohort.
+    This is a dictionary lookup: no recomputation over the full frame.
+    Falls back to all players when the player has no group in that cohort
+    (e.g. "Same season" for a multi-season aggregate).
+    """
+    groups = cohort_percentiles.get(cohort, {})
+    key = cohort_group_key(player_row, cohort, cohorts)
+    if key in groups:
+        return groups[key]
+    return cohort_percentiles[DEFAULT_COHORT][None]
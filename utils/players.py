@@ -3,11 +3,14 @@ import numpy as np
 import pandas as pd
 from utils.format import to_float, format_value
 from utils.filters import multiselect_filter
-from constants import LOWER_IS_BETTER
+from constants import LOWER_IS_BETTER, DATA_VERSION_CACHE_ENTRIES
 from utils.season import SEASON_NAME_MAP
+from utils.season_cube import aggregate_selections
+from utils.profiling import profiled, in_fragment_rerun
 
 # --------------------------- ENRICH PLAYER METRICS ---------------------------
 
+@profiled
 def enrich_player_metrics(obj):
     """
     Flexible wrapper:
@@ -154,47 +157,51 @@ def display_key_stats(title, p1_clean=None, p2_clean=None, metrics=None):
 
 # --------------------------- DATAFRAME ---------------------------
 
+@profiled
 def get_result_dataframe(df, selected_seasons):
     if len(selected_seasons) != 1:
-        aggregated_rows = []
+        return aggregate_player_rows(df, minutes_col="time", per90_suffix="_per90")
 
-        for _, rows in df.groupby("player_name"):
-            aggregated_rows.append(accumulate_player_rows(rows, minutes_col="time", per90_suffix="_per90"))
+    return df.drop_duplicates(subset=["player_name", "season", "team_title"])
+
+@profiled
+def aggregate_player_rows(df, minutes_col="time", per90_suffix="_per90"):
+    """
+    Multi-season totals of every player at once:
+    one groupby-sum for the numeric columns, the most recent row of each player
+    as template, and per-90 columns recomputed column-wise from the totals.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=df.columns)
 
-        return pd.DataFrame(aggregated_rows)
+    num_cols = list(df.select_dtypes(include="number").columns)
+    grouped = df.groupby("player_name", sort=True, observed=True)
 
-    return df.drop_duplicates(subset=["player_name", "season", "team_title"])
+    summed = grouped[num_cols].sum()
 
-# --------------------------- SEARCH + SELECT ---------------------------
+    # Most recent row per player as template (first one wins on ties)
+    template_idx = grouped["season"].idxmax()
+    result = df.loc[template_idx.to_numpy()].copy()
 
-def accumulate_player_rows(rows, minutes_col="time", per90_suffix="_per90"):
-    # Sum numeric columns
-    num_cols = rows.select_dtypes(include="number").columns
-    summed = rows[num_cols].sum()
-
-    # Use most recent row as template
-    base = rows.sort_values("season", ascending=False).iloc[0].copy()
-
-    # First, set all numeric columns to summed totals (for counting stats)
-    for col in num_cols:
-        base[col] = summed[col]
-
-    # Recalculate per-90s instead of using the summed values
-    if summed[minutes_col] > 0:
-        total_minutes = float(summed[minutes_col])
-        denominator = (total_minutes / 90)
-        # Detect per-90 columns by suffix (e.g. "npxG_per90")
-        per90_cols = [c for c in num_cols if c.endswith(per90_suffix)]
-        
-        for col in per90_cols:
-            raw_col = col[: -len(per90_suffix)]  # strip '_per90'
-            
-            if raw_col in summed:
-                # per90 = (total raw stat / total minutes) * 90
-                base[col] = (float(summed[raw_col]) / denominator)
-
-    base["season"] = "All seasons"
-    return base
+    summed = summed.loc[template_idx.index]
+    summed.index = result.index
+    result[num_cols] = summed
+
+    # Recalculate per-90s from the totals where the player has minutes
+    minutes = summed[minutes_col]
+    has_minutes = minutes > 0
+    denominator = (minutes / 90).where(has_minutes)
+    per90_cols = [c for c in num_cols if c.endswith(per90_suffix)]
+
+    for col in per90_cols:
+        raw_col = col[: -len(per90_suffix)]
+        if raw_col in summed:
+            result[col] = (summed[raw_col] / denominator).where(has_minutes, summed[col])
+
+    result["season"] = "All seasons"
+    return result
+
+# --------------------------- SEARCH + SELECT ---------------------------
 
 def build_pos_map(df):
     return (
@@ -206,9 +213,44 @@ def build_pos_map(df):
         .to_dict()
     )
 
-def select_single_player(df, pos_map, label="Player", key_prefix="p"):
+@profiled
+def build_player_index(df):
+    """
+    Lookup structure for player selection, built once per data version:
+    - options: player names, sorted
+    - positions: player -> row positions in df
+    - seasons: player -> seasons played, most recent first
+    - pos_map: player -> position (same as build_pos_map)
+    """
+    positions = df.groupby("player_name", sort=True, observed=True).indices
+    season_values = df["season"].to_numpy()
+
+    return {
+        "options": sorted(positions),
+        "positions": positions,
+        "seasons": {
+            name: sorted(set(season_values[pos]), reverse=True)
+            for name, pos in positions.items()
+        },
+        "pos_map": build_pos_map(df),
+    }
+
+@st.cache_resource(max_entries=DATA_VERSION_CACHE_ENTRIES)
+def get_player_index(_df, data_version):
+    return build_player_index(_df)
+
+# Most players the comparison pages compare at once, and picker slots per row
+MAX_COMPARE_PLAYERS = 10
+PLAYERS_PER_ROW = 2
+
+def select_player_seasons(pos_map, player_index, label="Player", key_prefix="p"):
+    """
+    Player + season(s) picker widgets only (no stats gathered), options from the
+    player index (see get_player_index).
+    Returns (player, selected seasons, all seasons of the player) or (None, None, None).
+    """
     placeholder = "— Select a player —"
-    players = [placeholder] + sorted(df["player_name"].unique())
+    players = [placeholder] + player_index["options"]
 
     stored_name = st.session_state.get(f"{key_prefix}_player_name", placeholder)
     default_idx = players.index(stored_name) if stored_name in players else 0
@@ -232,7 +274,7 @@ def select_single_player(df, pos_map, label="Player", key_prefix="p"):
         st.session_state.pop(f"{key_prefix}_season_select", None)
         st.session_state.pop(f"__store__{key_prefix}_season_select", None)
         st.session_state.pop(f"{key_prefix}_prev_player", None)
-        return None, None
+        return None, None, None
 
     # ---- RESET multiselect if player changed ----
     prev_player = st.session_state.get(f"{key_prefix}_prev_player")
@@ -242,30 +284,90 @@ def select_single_player(df, pos_map, label="Player", key_prefix="p"):
     st.session_state[f"{key_prefix}_prev_player"] = player
     st.session_state[f"{key_prefix}_player_name"] = player
 
-    rows = df[df["player_name"] == player].copy()
+    all_seasons_for_player = player_index["seasons"][player]
 
     season_key = f"{key_prefix}_season_select__{player}"
     selected_seasons = multiselect_filter(
         "Select season(s)",
-        rows["season"],
+        pd.Series(all_seasons_for_player),
         season_key,
         default_all=True,
         sort_reverse=True,
         format_func=lambda s: SEASON_NAME_MAP.get(str(s), s)
     )
 
-    all_seasons_for_player = sorted(rows["season"].unique(), reverse=True)
-    selected_is_all = (len(selected_seasons) == 0) or (set(selected_seasons) == set(all_seasons_for_player))
+    return player, selected_seasons, all_seasons_for_player
 
-    if selected_is_all:
-        row = accumulate_player_rows(rows, minutes_col="time", per90_suffix="_per90")
-    elif len(selected_seasons) == 1:
-        season = selected_seasons[0]
-        row = rows[rows["season"] == season].sort_values("season", ascending=False).iloc[0]
-    else:
-        subset = rows[rows["season"].isin(selected_seasons)]
-        row = accumulate_player_rows(subset, minutes_col="time", per90_suffix="_per90")
-
-    label_str = f"{row['player_name']} ({row['team_title']})"
+# --------------------------- COMPARISON (N PLAYERS) ---------------------------
 
-    return row, label_str
+def select_players(pos_map, player_index, key_prefix="p"):
+    """
+    "Players to compare" count plus one player/season(s) picker per slot
+    (slots p1, p2, ... share their state with the two-player pages).
+    Returns the [(player, seasons)] selections of the filled slots, seasons
+    empty when the player's whole career is selected.
+    """
+    n_players = st.number_input(
+        "Players to compare",
+        min_value=1,
+        max_value=MAX_COMPARE_PLAYERS,
+        value=st.session_state.get("n_compare_players", 2),
+        step=1,
+    )
+    st.session_state["n_compare_players"] = n_players
+
+    selections = []
+    for first in range(0, n_players, PLAYERS_PER_ROW):
+        cols = st.columns(PLAYERS_PER_ROW)
+        for slot, col in zip(range(first, min(first + PLAYERS_PER_ROW, n_players)), cols):
+            with col:
+                player, seasons, all_seasons = select_player_seasons(
+                    pos_map, label=f"Player {slot + 1}", key_prefix=f"{key_prefix}{slot + 1}", player_index=player_index
+                )
+            if player is not None:
+                selections.append(player_selection(player, seasons, all_seasons))
+    return selections
+
+def player_selection(player, seasons, all_seasons):
+    """(player, seasons) selection of a picker; seasons empty when the whole career is selected."""
+    if len(seasons) == 0 or set(seasons) == set(all_seasons):
+        return player, []
+    return player, list(seasons)
+
+# Session state key the comparison pages' chart fragments read the selections from
+SELECTIONS_KEY = "comparison_selections"
+
+def publish_selections(selections):
+    """
+    Hand the selections to the page's chart fragments. When only the player selection
+    fragment reran and the selection changed, the whole page reruns so the charts follow.
+    """
+    changed = st.session_state.get(SELECTIONS_KEY) != selections
+    st.session_state[SELECTIONS_KEY] = selections
+    if changed and in_fragment_rerun():
+        st.rerun()
+
+def published_selections():
+    """The selections last published by the page's player selection fragment."""
+    return st.session_state.get(SELECTIONS_KEY, [])
+
+def comparison_labels(players):
+    """ "name (team)" per row; repeats of the same label get their season appended."""
+    labels = (players["player_name"].astype(str) + " (" + players["team_title"].astype(str) + ")").tolist()
+    seen = {}
+    for i, label in enumerate(labels):
+        seen[label] = seen.get(label, 0) + 1
+        if seen[label] > 1:
+            season = str(players["season"].iloc[i])
+            labels[i] = f"{label} – {SEASON_NAME_MAP.get(season, season)}"
+    return labels
+
+@profiled
+def gather_players(df, season_cube, selections):
+    """
+    Stats of every selected player in one batched step: a single masked sum over the
+    season cube (see aggregate_selections), one row per selection plus a "label" column.
+    """
+    players = aggregate_selections(season_cube, df, selections).reset_index(drop=True)
+    players["label"] = comparison_labels(players)
+    return players
@@ -0,0 +1,198 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Opt-in: set UNDERSTAT_PROFILE=1 to time page sections and utils functions on every rerun
+PROFILING = os.environ.get("UNDERSTAT_PROFILE", "") == "1"
+
+# Optional JSONL file every finished rerun is appended to (one line per span)
+PROFILE_LOG = os.environ.get("UNDERSTAT_PROFILE_LOG", "")
+
+# Shared no-op context: with profiling off a span costs one function call
+_NOOP = nullcontext()
+
+# Each session's reruns run in that session's script thread
+_local = threading.local()
+_log_lock = threading.Lock()
+
+# Name -> function returning counters, shown under the panel of every profiled rerun
+_stats = {}
+
+# --------------------------- SPANS ---------------------------
+
+def _open(name):
+    """Start a span record at the current depth; records keep start order."""
+    record = {"span": name, "depth": _local.depth, "wall_ms": None, "cpu_ms": None}
+    _local.spans.append(record)
+    _local.depth += 1
+    # thread_time: CPU of this session's thread only, not of other sessions
+    return record, time.perf_counter(), time.thread_time()
+
+def _close(opened):
+    record, wall, cpu = opened
+    record["wall_ms"] = (time.perf_counter() - wall) * 1000
+    record["cpu_ms"] = (time.thread_time() - cpu) * 1000
+    _local.depth -= 1
+
+def _active():
+    return PROFILING and getattr(_local, "spans", None) is not None
+
+@contextmanager
+def _timed(name):
+    opened = _open(name)
+    try:
+        yield
+    finally:
+        _close(opened)
+
+def span(name):
+    """Context manager timing a block (no-op unless profiling is on and a page started)."""
+    if not _active():
+        return _NOOP
+    return _timed(name)
+
+def profiled(fn=None, *, name=None):
+    """
+    Decorator timing every call of a utils function.
+    With profiling off the function is returned unchanged (zero overhead).
+    Put it below @st.cache_*: only cache misses are timed.
+    """
+    if fn is None:
+        return functools.partial(profiled, name=name)
+    if not PROFILING:
+        return fn
+
+    label = name or fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _active():
+            return fn(*args, **kwargs)
+        with _timed(label):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+# --------------------------- PAGE SECTIONS ---------------------------
+
+def start_page(page):
+    """Reset the spans at the top of a page rerun."""
+    if not PROFILING:
+        return
+    _local.page = page
+    _local.spans = []
+    _local.depth = 0
+    _local.section = None
+    _local.started = (time.perf_counter(), time.thread_time())
+
+def section(name):
+    """
+    Close the previous page section and open the next one, so page sections can be
+    timed without indenting the page code. Function spans nest under the open section.
+    """
+    if not _active():
+        return
+    _end_section()
+    _local.section = _open(name)
+
+def _end_section():
+    if _local.section is not None:
+        _close(_local.section)
+        _local.section = None
+
+# --------------------------- FRAGMENTS ---------------------------
+
+def in_fragment_rerun():
+    """True while only fragments rerun (a widget inside an st.fragment changed)."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return bool(ctx is not None and ctx.fragment_ids_this_run)
+
+def fragment(page, name):
+    """
+    st.fragment decorator for page sections that rerun on their own.
+    In a full page run the body is timed as part of the page; when only the
+    fragment reruns it is profiled as its own run, "<page> / <name>".
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def body(*args, **kwargs):
+            if not PROFILING or not in_fragment_rerun():
+                return fn(*args, **kwargs)
+            start_page(f"{page} / {name}")
+            section(name)
+            result = fn(*args, **kwargs)
+            render_profile_panel()
+            return result
+
+        return st.fragment(body)
+
+    return decorate
+
+# --------------------------- COUNTERS ---------------------------
+
+def register_stats(name, fn):
+    """Report fn()'s counters (a flat dict) in the profile panel and log."""
+    _stats[name] = fn
+
+def _collect_stats():
+    return {name: fn() for name, fn in _stats.items()} if _stats else {}
+
+# --------------------------- PANEL & LOG ---------------------------
+
+def _session_id():
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+def _write_log(page, spans, total, counters):
+    ts = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+    session_id = _session_id()
+    lines = [
+        json.dumps({"ts": ts, "session_id": session_id, "page": page, **s})
+        for s in spans + [total]
+    ] + [
+        json.dumps({"ts": ts, "session_id": session_id, "page": page, "stats": name, **values})
+        for name, values in counters.items()
+    ]
+    with _log_lock:
+        with open(PROFILE_LOG, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+def render_profile_panel():
+    """
+    End the rerun: show its spans and the registered counters in a collapsible sidebar
+    panel and append them to UNDERSTAT_PROFILE_LOG if set. Call it last on the page
+    (and before any st.stop()).
+    """
+    if not _active():
+        return
+    _end_section()
+    wall, cpu = _local.started
+    total = {"span": "TOTAL", "depth": 0,
+             "wall_ms": (time.perf_counter() - wall) * 1000,
+             "cpu_ms": (time.thread_time() - cpu) * 1000}
+    spans = [s for s in _local.spans if s["wall_ms"] is not None]
+    page = _local.page
+    _local.spans = None
+    counters = _collect_stats()
+
+    # A fragment rerun can only write inside the fragment
+    container = st.container() if in_fragment_rerun() else st.sidebar
+    with container.expander(f"⏱️ Profile: {total['wall_ms']:.0f} ms", expanded=False):
+        st.dataframe(
+            [{"Span": " " * s["depth"] + s["span"],
+              "Wall (ms)": round(s["wall_ms"], 1),
+              "CPU (ms)": round(s["cpu_ms"], 1)} for s in spans + [total]],
+            hide_index=True,
+            width="stretch",
+        )
+        for name, values in counters.items():
+            st.caption(f"{name}: " + ", ".join(f"{k} {v}" for k, v in values.items()))
+
+    if PROFILE_LOG:
+        _write_log(page, spans, total, counters)
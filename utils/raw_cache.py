@@ -0,0 +1,73 @@
+from pathlib import Path
+from datetime import datetime, timezone
+import gzip
+import json
+import os
+
+# Raw Understat payloads, stored once per content hash (see payload_hash)
+CACHE_DIR = Path("data/raw_cache")
+
+# partition key -> [{"fetched": date, "hash": digest}, ...], oldest first
+INDEX_PATH = CACHE_DIR / "_index.json"
+
+def object_path(digest, cache_dir=CACHE_DIR):
+    """Gzipped JSON of one payload, fanned out by the first two hex digits of its hash."""
+    return Path(cache_dir) / "objects" / digest[:2] / f"{digest}.json.gz"
+
+def store_payload(records, digest, cache_dir=CACHE_DIR):
+    """
+    Save a raw payload under its content hash (no-op if it is already cached).
+    Written to a hidden temp file and renamed into place, so safe to call from worker threads.
+    """
+    path = object_path(digest, cache_dir)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return path
+
+def load_payload(digest, cache_dir=CACHE_DIR):
+    with gzip.open(object_path(digest, cache_dir), "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+def load_cache_index(path=INDEX_PATH):
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_cache_index(index, path=INDEX_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(dict(sorted(index.items())), f, indent=2)
+    os.replace(tmp, path)
+
+def record_fetch(index, key, digest, fetched=None):
+    """
+    Add a fetch of partition `key` to the index. Fetches on the same date replace each other,
+    so the index keeps one payload per partition and fetch date.
+    """
+    fetched = fetched or datetime.now(timezone.utc).date().isoformat()
+    entries = [e for e in index.get(key, []) if e["fetched"] != fetched]
+    entries.append({"fetched": fetched, "hash": digest})
+    index[key] = sorted(entries, key=lambda e: e["fetched"])
+    return index
+
+def latest_payloads(index, as_of=None):
+    """partition key -> hash of the most recent fetch (on or before as_of, an ISO date, if given)."""
+    latest = {}
+    for key, entries in index.items():
+        entries = [e for e in entries if as_of is None or e["fetched"] <= as_of]
+        if entries:
+            latest[key] = entries[-1]["hash"]
+    return latest
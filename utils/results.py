@@ -0,0 +1,118 @@
+import threading
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.filters import selection_mask, combine_masks, sorted_column
+from utils.players import get_result_dataframe, enrich_player_metrics
+from utils.season_cube import aggregate_seasons
+from utils.season import SEASON_CODE_MAP
+from utils.profiling import profiled
+
+# Bounds of the shared Find Players result cache: filter combinations kept and seconds
+RESULT_CACHE_ENTRIES = 32
+RESULT_CACHE_TTL = 60 * 60
+
+# Rows per page offered by the results grid
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Sorted row positions scanned per step when looking for the rows of a page
+SCAN_BLOCK = 4096
+
+# --------------------------- RESULT TABLE ---------------------------
+
+@profiled
+def build_result_table(df, season_cube, filter_index, seasons=(), leagues=(), teams=(), positions=()):
+    """
+    Find Players rows for a season/league/team/position selection, before stat filters.
+    Returns {"df": result frame, "sorted": {}, "orders": {}, "lock": lock}; "sorted" collects
+    sorted_column lookups for the stat predicates (see sorted_columns) and "orders" the row
+    orders of the results grid (see sort_order), both as they are first needed. The table is
+    shared by all sessions, so both are only filled under its lock.
+    """
+    if len(seasons) != 1 and not (leagues or teams or positions):
+        # Season-only selection: masked sum over the season cube instead of a row-level groupby
+        season_codes = [SEASON_CODE_MAP.get(s, s) for s in seasons]
+        result = enrich_player_metrics(aggregate_seasons(season_cube, df, seasons=season_codes))
+    else:
+        row_mask = combine_masks(
+            selection_mask(filter_index, "season", seasons),
+            selection_mask(filter_index, "league", leagues),
+            selection_mask(filter_index, "team_title", teams),
+            selection_mask(filter_index, "position", positions),
+        )
+        filtered = df if row_mask is None else df[row_mask]
+        result = get_result_dataframe(filtered, list(seasons))
+
+    return {"df": result, "sorted": {}, "orders": {}, "lock": threading.Lock()}
+
+@st.cache_resource(max_entries=RESULT_CACHE_ENTRIES, ttl=RESULT_CACHE_TTL)
+def get_result_table(_df, _season_cube, _filter_index, data_version, seasons, leagues, teams, positions):
+    """
+    build_result_table shared by all sessions, keyed by data version and selection
+    (tuples), so changing only stat filters reuses the result and its sorted columns.
+    Treat the frame as read-only.
+    """
+    return build_result_table(_df, _season_cube, _filter_index, seasons, leagues, teams, positions)
+
+def _sorted_column(result, col):
+    """sorted_column lookup of col, built once per result table (caller holds the lock)."""
+    if col not in result["sorted"]:
+        result["sorted"][col] = sorted_column(result["df"], col)
+    return result["sorted"][col]
+
+def sorted_columns(result, cols):
+    """
+    {col: sorted_column lookup} for the columns of cols present in the result frame,
+    the sorted_index of utils.filters.stat_mask. Built once per result table.
+    """
+    cols = [c for c in cols if c in result["df"].columns]
+    with result["lock"]:
+        return {col: _sorted_column(result, col) for col in cols}
+
+# --------------------------- RESULTS GRID ---------------------------
+
+@profiled
+def sort_order(result, col, descending=False):
+    """
+    Row positions of the result frame sorted by col, missing values last.
+    Computed once per column and direction and kept on the (shared) result table.
+    """
+    key = (col, descending)
+    with result["lock"]:
+        if key not in result["orders"]:
+            df = result["df"]
+            if pd.api.types.is_numeric_dtype(df[col]):
+                # Same lookup as the stat predicates: one argsort serves both
+                order, sorted_values, _ = _sorted_column(result, col)
+                if descending:
+                    n_present = int((~np.isnan(sorted_values)).sum())
+                    order = np.concatenate([order[:n_present][::-1], order[n_present:]])
+            else:
+                order = (df[col].reset_index(drop=True)
+                         .sort_values(ascending=not descending, na_position="last", kind="stable")
+                         .index.to_numpy())
+            result["orders"][key] = order
+        return result["orders"][key]
+
+@profiled
+def page_positions(order, mask, start, stop):
+    """
+    Row positions of the rows start..stop (in sort order) among the rows kept by mask.
+    Sorted positions are scanned block by block from the top until the page is filled:
+    the first pages are cheap, but the cost grows with the page offset (the last page
+    of a large result scans nearly the whole order), and no work is kept between pages.
+    """
+    if mask is None:
+        return order[start:stop]
+
+    picked = []
+    seen = 0
+    for i in range(0, len(order), SCAN_BLOCK):
+        block = order[i:i + SCAN_BLOCK]
+        block = block[mask[block]]
+        if seen + len(block) > start:
+            picked.append(block[max(start - seen, 0):stop - seen])
+        seen += len(block)
+        if seen >= stop:
+            break
+    return np.concatenate(picked) if picked else order[:0]
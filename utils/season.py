@@ -15,6 +15,9 @@ SEASON_NAME_MAP = {
     "2025": "2025/26",
 }
 
+# "2025/26" -> "2025", for going back from display labels to stored season codes
+SEASON_CODE_MAP = {name: code for code, name in SEASON_NAME_MAP.items()}
+
 def get_current_understat_season(dt=None):
     """
     Returns the Understat season start year.
@@ -0,0 +1,141 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+from utils.profiling import profiled
+from constants import DATA_VERSION_CACHE_ENTRIES
+
+# Raw counting stats stored in the cube (per-90s are derived from them)
+COUNTING_COLS = ["games", "time", "goals", "xG", "shots", "assists",
+                 "xA", "key_passes", "npg", "npxG", "xGChain", "xGBuildup", "red_cards", "yellow_cards"]
+
+# --------------------------- BUILD ---------------------------
+
+@profiled
+def build_season_cube(df, player_index):
+    """
+    Dense player x season x stat block of counting stats.
+    - players: player names (cube row = position in player_index["options"])
+    - seasons: seasons in ascending order (cube column = season ordinal)
+    - values: float array (players, seasons, stats), rows of the same player-season summed
+    - template: int array (players, seasons), row position in df of the player's first
+      row in that season, -1 if the player did not play that season
+    Expects the prepared frame (raw season codes); a frame with the same row order
+    (e.g. the labelled one) can be used to read template rows.
+    """
+    players = player_index["options"]
+    seasons = sorted(df["season"].unique())
+    stats = [c for c in COUNTING_COLS if c in df.columns]
+
+    player_ids = pd.Categorical(df["player_name"], categories=players).codes
+    season_ids = pd.Categorical(df["season"], categories=seasons).codes
+    cell = player_ids.astype(np.int64) * len(seasons) + season_ids
+
+    n_cells = len(players) * len(seasons)
+    values = np.empty((n_cells, len(stats)), dtype="float64")
+    for k, stat in enumerate(stats):
+        column = pd.to_numeric(df[stat], errors="coerce").fillna(0).to_numpy(dtype="float64")
+        values[:, k] = np.bincount(cell, weights=column, minlength=n_cells)
+
+    template = np.full(n_cells, -1, dtype=np.int64)
+    first_rows = pd.Series(np.arange(len(df))).groupby(cell).first()
+    template[first_rows.index.to_numpy()] = first_rows.to_numpy()
+
+    return {
+        "players": players,
+        "player_ids": {name: i for i, name in enumerate(players)},
+        "seasons": seasons,
+        "stats": stats,
+        "values": values.reshape(len(players), len(seasons), len(stats)),
+        "template": template.reshape(len(players), len(seasons)),
+    }
+
+@st.cache_resource(max_entries=DATA_VERSION_CACHE_ENTRIES)
+def get_season_cube(_df, _player_index, data_version):
+    """Season cube of the prepared frame, built once per data version."""
+    return build_season_cube(_df, _player_index)
+
+# --------------------------- AGGREGATE ---------------------------
+
+def season_mask(cube, seasons=None):
+    """Boolean mask over the cube's season axis (None or empty = all seasons)."""
+    if not seasons:
+        return np.ones(len(cube["seasons"]), dtype=bool)
+    wanted = {str(s) for s in seasons}
+    return np.array([s in wanted for s in cube["seasons"]], dtype=bool)
+
+def _aggregate(cube, df, ids, played, minutes_col, per90_suffix):
+    """
+    One row per cube player id, summing the cells where played is True (ids x seasons):
+    counting stats summed, per-90s derived from the totals, other columns from the
+    most recent played season's row in df. Ids without a played cell are dropped.
+    Returns (rows, kept): kept is the boolean mask of the ids that have a row.
+    """
+    template = cube["template"][ids]
+    played = played & (template >= 0)
+    keep = played.any(axis=1)
+
+    ids, template, played = ids[keep], template[keep], played[keep]
+    if len(ids) == 0:
+        return df.iloc[:0].copy(), keep
+
+    # Most recent played season
+    last = played.shape[1] - 1 - np.argmax(played[:, ::-1], axis=1)
+    template_rows = template[np.arange(len(ids)), last]
+
+    totals = np.einsum("psk,ps->pk", cube["values"][ids], played.astype(cube["values"].dtype))
+
+    result = df.iloc[template_rows].copy()
+    for k, stat in enumerate(cube["stats"]):
+        result[stat] = totals[:, k]
+
+    if minutes_col in cube["stats"]:
+        minutes = totals[:, cube["stats"].index(minutes_col)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            denominator = np.where(minutes > 0, minutes / 90, np.nan)
+            for k, stat in enumerate(cube["stats"]):
+                per90_col = stat + per90_suffix
+                if per90_col in result.columns:
+                    result[per90_col] = totals[:, k] / denominator
+
+    return result, keep
+
+@profiled
+def aggregate_seasons(cube, df, players=None, seasons=None, minutes_col="time", per90_suffix="_per90"):
+    """
+    Multi-season totals for the given players (None = everyone) over a season subset.
+    Counting stats are a masked sum over the cube, per-90s are derived from the totals,
+    and the other columns come from each player's most recent selected season in df.
+    Players without a row in the selected seasons are left out.
+    Cost is O(players x seasons), independent of the number of rows.
+    """
+    if players is None:
+        ids = np.arange(len(cube["players"]))
+    else:
+        ids = np.array([cube["player_ids"][p] for p in players if p in cube["player_ids"]], dtype=np.int64)
+
+    played = np.broadcast_to(season_mask(cube, seasons), (len(ids), len(cube["seasons"])))
+    result, _ = _aggregate(cube, df, ids, played, minutes_col, per90_suffix)
+    result["season"] = "All seasons"
+    return result
+
+@profiled
+def aggregate_selections(cube, df, selections, minutes_col="time", per90_suffix="_per90"):
+    """
+    Totals of several (player, seasons) selections in one masked sum over the cube,
+    one row per selection in the given order (a player may appear more than once
+    with different seasons). Empty seasons = all seasons. "season" keeps the season
+    code when exactly one season was selected, "All seasons" otherwise.
+    Selections without a row in their seasons are left out.
+    """
+    selections = [(p, s) for p, s in selections if p in cube["player_ids"]]
+    if not selections:
+        return df.iloc[:0].copy()
+    ids = np.array([cube["player_ids"][p] for p, _ in selections], dtype=np.int64)
+    played = np.array([season_mask(cube, s) for _, s in selections], dtype=bool)
+
+    result, kept = _aggregate(cube, df, ids, played, minutes_col, per90_suffix)
+    if len(result):
+        single = np.array([len(s) == 1 for _, s in selections], dtype=bool)[kept]
+        seasons = np.asarray(cube["seasons"], dtype=object)[np.argmax(played[kept], axis=1)]
+        result["season"] = np.where(single, seasons, "All seasons")
+    return result
@@ -0,0 +1,151 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+from utils.percentiles import MIN_MINUTES_COHORT, position_group
+from utils.profiling import profiled
+from constants import DATA_VERSION_CACHE_ENTRIES
+
+# Counting stats whose per-90 values make up a player's profile
+SIMILARITY_STATS = ["goals", "xG", "npg", "npxG", "shots", "assists", "xA",
+                    "key_passes", "xGChain", "xGBuildup"]
+
+# Default minimum minutes of a similar player-season; also the population
+# the features are standardized over (low-minute per-90s are mostly noise)
+MIN_MINUTES_SIMILAR = MIN_MINUTES_COHORT
+
+# Candidate rows per block of the nearest-neighbour search
+BLOCK_ROWS = 8192
+
+# --------------------------- INDEX ---------------------------
+
+@profiled
+def build_similarity_index(df, season_cube, stats=None, standardize_min_minutes=MIN_MINUTES_SIMILAR):
+    """
+    Standardized per-90 matrix of every player-season, built from the season cube
+    (rows of the same player-season summed, per-90s derived from the totals).
+    - matrix: float32 (player-seasons, stats), z-scores; sq_norms: squared row norms
+    - mean / std: of each per-90 over player-seasons with standardize_min_minutes or more
+    - players, seasons, leagues, position_groups, positions, minutes: one entry per row
+    League and position come from the player's first row of that season in df.
+    """
+    if stats is None:
+        stats = SIMILARITY_STATS
+    stats = [s for s in stats if s in season_cube["stats"]]
+    time_k = season_cube["stats"].index("time")
+
+    p_ids, s_ids = np.nonzero(season_cube["template"] >= 0)
+    minutes = season_cube["values"][p_ids, s_ids, time_k]
+    played = minutes > 0
+    p_ids, s_ids, minutes = p_ids[played], s_ids[played], minutes[played]
+
+    stat_ks = [season_cube["stats"].index(s) for s in stats]
+    per90 = season_cube["values"][p_ids, s_ids][:, stat_ks] * (90 / minutes)[:, None]
+
+    pool = per90[minutes >= standardize_min_minutes]
+    if len(pool) < 2:
+        pool = per90
+    mean = pool.mean(axis=0)
+    std = pool.std(axis=0)
+    std[std == 0] = 1.0
+
+    matrix = ((per90 - mean) / std).astype(np.float32)
+    rows = season_cube["template"][p_ids, s_ids]
+    positions = df["position"].to_numpy(dtype=object)[rows].astype(str)
+    codes, uniques = pd.factorize(positions)
+    groups = np.array([position_group(p) for p in uniques], dtype=object)[codes]
+
+    return {
+        "stats": stats,
+        "mean": mean,
+        "std": std,
+        "matrix": matrix,
+        "sq_norms": np.einsum("ij,ij->i", matrix, matrix),
+        "players": np.asarray(season_cube["players"], dtype=object)[p_ids],
+        "seasons": np.asarray(season_cube["seasons"], dtype=object)[s_ids].astype(str),
+        "leagues": df["league"].to_numpy(dtype=object)[rows].astype(str),
+        "positions": positions,
+        "position_groups": groups,
+        "minutes": minutes,
+    }
+
+@st.cache_resource(max_entries=DATA_VERSION_CACHE_ENTRIES)
+def get_similarity_index(_df, _season_cube, data_version):
+    """Similarity index of the prepared frame, built once per data version."""
+    return build_similarity_index(_df, _season_cube)
+
+# --------------------------- SEARCH ---------------------------
+
+def nearest_neighbours(matrix, sq_norms, queries, k, candidates=None, block_rows=BLOCK_ROWS):
+    """
+    k nearest rows of matrix (Euclidean) for each query row, over blocks of rows:
+    one matrix product per block, best k kept with argpartition.
+    Returns (row positions, distances), both (queries, <=k), nearest first;
+    rows outside candidates (boolean mask) are never returned.
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=matrix.dtype))
+    q_norms = np.einsum("ij,ij->i", queries, queries)
+    best_d = np.empty((len(queries), 0), dtype=matrix.dtype)
+    best_i = np.empty((len(queries), 0), dtype=np.int64)
+
+    for start in range(0, len(matrix), block_rows):
+        stop = min(start + block_rows, len(matrix))
+        d = q_norms[:, None] + sq_norms[None, start:stop] - 2 * queries @ matrix[start:stop].T
+        if candidates is not None:
+            d[:, ~candidates[start:stop]] = np.inf
+        idx = np.broadcast_to(np.arange(start, stop), d.shape)
+
+        d = np.concatenate([best_d, d], axis=1)
+        idx = np.concatenate([best_i, idx], axis=1)
+        if d.shape[1] > k:
+            keep = np.argpartition(d, k - 1, axis=1)[:, :k]
+            d, idx = np.take_along_axis(d, keep, axis=1), np.take_along_axis(idx, keep, axis=1)
+        best_d, best_i = d, idx
+
+    order = np.argsort(best_d, axis=1, kind="stable")
+    best_d = np.take_along_axis(best_d, order, axis=1)
+    best_i = np.take_along_axis(best_i, order, axis=1)
+    return best_i, np.sqrt(np.maximum(best_d, 0))
+
+def query_vector(index, player_row):
+    """Standardized per-90 vector of a player row (single season or aggregate); None if incomplete."""
+    values = pd.to_numeric(
+        pd.Series([player_row.get(f"{s}_per90") for s in index["stats"]]), errors="coerce"
+    ).to_numpy(dtype="float64")
+    if np.isnan(values).any():
+        return None
+    return (values - index["mean"]) / index["std"]
+
+@profiled
+def similar_players(index, player_row, k=10, min_minutes=MIN_MINUTES_SIMILAR,
+                    same_position=False, same_league=False):
+    """
+    The k player-seasons closest to player_row in standardized per-90 space,
+    other players only. Optional guards: minimum minutes, same position group
+    (substitute flag ignored) and same league as player_row.
+    Returns a frame: player_name, season, league, position, time, distance.
+    """
+    columns = ["player_name", "season", "league", "position", "time", "distance"]
+    query = query_vector(index, player_row)
+    if query is None or k <= 0:
+        return pd.DataFrame(columns=columns)
+
+    candidates = index["players"] != player_row.get("player_name")
+    if min_minutes:
+        candidates &= index["minutes"] >= min_minutes
+    if same_position:
+        candidates &= index["position_groups"] == position_group(player_row.get("position", ""))
+    if same_league:
+        candidates &= index["leagues"] == str(player_row.get("league", ""))
+
+    rows, distances = nearest_neighbours(index["matrix"], index["sq_norms"], query, k, candidates)
+    found = np.isfinite(distances[0])
+    rows, distances = rows[0][found], distances[0][found]
+
+    return pd.DataFrame({
+        "player_name": index["players"][rows],
+        "season": index["seasons"][rows],
+        "league": index["leagues"][rows],
+        "position": index["positions"][rows],
+        "time": index["minutes"][rows].astype(np.int64),
+        "distance": distances,
+    }, columns=columns)